@@ -0,0 +1,8 @@
+#!/bin/bash
+
+source /var/app/venv/*/bin/activate
+cd /var/app/current
+
+if [[ "$EB_IS_COMMAND_LEADER" == "true" ]]; then
+    python manage.py warm_cache
+fi
@@ -5,6 +5,7 @@ cd /var/app/staging
 
 if [[ "$EB_IS_COMMAND_LEADER" == "true" ]]; then
     python manage.py migrate --noinput
+    python manage.py createcachetable
 fi
 
 python manage.py collectstatic --noinput
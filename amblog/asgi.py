@@ -3,6 +3,18 @@ ASGI config for amblog project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+To serve the site with ASGI, install uvicorn and run gunicorn with uvicorn
+workers (in place of the web process in the Procfile), setting the
+BLOG_ASYNC_VIEWS environment variable so the landing and post detail pages
+use their async views (see blog/async_views.py):
+
+    BLOG_ASYNC_VIEWS=1 gunicorn --bind 127.0.0.1:8000 --workers=3 \\
+        --worker-class uvicorn.workers.UvicornWorker amblog.asgi:application
+
+Other views are synchronous and run in a single thread per worker, so more
+workers are needed than under WSGI for the same throughput of those pages.
+Compare the two modes with the benchmark_async_views command.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/3.1/howto/deployment/asgi/
 """
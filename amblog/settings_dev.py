@@ -13,9 +13,12 @@ https://docs.djangoproject.com/en/3.1/ref/settings/
 # If running in a dev environment, set env variable
 # DJANGO_DEVELOPMENT = True
 
+import copy
 import os
 from pathlib import Path
 
+from django.utils.log import DEFAULT_LOGGING
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -35,7 +38,13 @@ SECURE_HSTS_INCLUDE_SUBDOMAINS = False
 SECURE_HSTS_PRELOAD = False
 
 # Error emails
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# Emails are queued as background jobs and sent with BLOG_EMAIL_BACKEND.
+# Admin error reports are sent directly, as the database holding the queue
+# may be the cause of the error (see blog/mail.py).
+EMAIL_BACKEND = 'blog.mail.QueuedEmailBackend'
+BLOG_EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+LOGGING = copy.deepcopy(DEFAULT_LOGGING)
+LOGGING['handlers']['mail_admins']['class'] = 'blog.mail.AdminEmailHandler'
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_USE_TLS = True
 EMAIL_PORT = 587
@@ -56,6 +65,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.sitemaps',
     'blog.apps.BlogConfig',
     'social_django',
     'django_cleanup.apps.CleanupConfig',
@@ -66,6 +76,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.common.BrokenLinkEmailsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'blog.middleware.CompressionMiddleware',
+    'blog.timing.TimingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -100,15 +112,47 @@ WSGI_APPLICATION = 'amblog.wsgi.application'
 # https://docs.djangoproject.com/en/3.1/ref/settings/#databases
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql_psycopg2',
+        # PostgreSQL with connection health checks and pooling (see
+        # blog/db).
+        'ENGINE': 'blog.db.backends.postgresql',
         'NAME': os.environ['RDS_DB_NAME'],
         'USER': os.environ['RDS_USERNAME'],
         'PASSWORD': os.environ['RDS_PASSWORD'],
         'HOST': os.environ['RDS_HOSTNAME'],
         'PORT': os.environ['RDS_PORT'],
+        # Keep connections open between requests, checking they still work
+        # at the start of each request.
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 300)),
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+
+# Setting DB_POOL_SIZE shares that many connections between the threads of
+# each web worker, in place of one persistent connection per thread.
+if os.environ.get('DB_POOL_SIZE'):
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['POOL'] = {
+        'MAX_SIZE': int(os.environ['DB_POOL_SIZE']),
+        'TIMEOUT': 10,
+        'MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 300)),
+    }
+
+# Cache
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
+# Sessions are kept in the database: the cache is a table in the same
+# database (see CACHES), so cached_db sessions would only add cache table
+# reads and writes. Signed cookie sessions avoid the read, but could not be
+# revoked on logout. A logged in user's page view reads the session row once
+# and only writes it when the session changes. Visitors without a session
+# cookie never load a session, and messages are kept in a cookie.
+SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
 AUTH_PASSWORD_VALIDATORS = [
@@ -185,6 +229,40 @@ LOGOUT_REDIRECT_URL = '/'
 # Crispy forms
 CRISPY_TEMPLATE_PACK = 'bootstrap4'
 
+# Blog list views (search, drafts and comments) paginate by cursor rather
+# than page number when True. See blog/pagination.py.
+BLOG_CURSOR_PAGINATION = False
+
+# Seconds anonymous blog pages are cached for (0 disables the page cache).
+# See blog/cache.py.
+BLOG_PAGE_CACHE_TIMEOUT = 60 * 60
+
+# Number of the latest posts listed in the RSS and Atom feeds. See
+# blog/feeds.py.
+BLOG_FEED_ITEMS = 50
+
+# Strip template whitespace from HTML responses. Responses are compressed
+# by blog.middleware.CompressionMiddleware.
+BLOG_MINIFY_HTML = True
+
+# Filter searches by tag with a text input suggesting tag names (see
+# blog/autocomplete.py) rather than a select rendering every tag.
+BLOG_TAG_AUTOCOMPLETE = True
+
+# Serve the landing and post detail pages with async views, for ASGI
+# deployments (see amblog/asgi.py). Leave unset under WSGI, where async views
+# only add overhead.
+BLOG_ASYNC_VIEWS = bool(os.environ.get('BLOG_ASYNC_VIEWS'))
+
+# Record query, template and storage times of each request, reported in a
+# Server-Timing header and logged to blog.metrics. See blog/timing.py.
+BLOG_SERVER_TIMING = True
+
+# Background jobs (image processing, image deletion and email) run during
+# the request when True, or are queued and run by the run_jobs command when
+# False. See blog/jobs.py.
+BLOG_JOBS_INLINE = True
+
 # CKEditor
 CKEDITOR_CONFIGS = {
     'default': {
@@ -19,6 +19,8 @@ from django.contrib import admin
 from django.urls import include, path
 from django.views.generic import TemplateView
 
+from blog import sitemaps
+
 # Serve static files during dev
 urlpatterns = [
     path('__site-admin__/', admin.site.urls),
@@ -30,4 +32,7 @@ urlpatterns = [
     path('privacy-policy/', TemplateView.as_view(template_name='privacy_policy.html'), name='privacy-policy'),
     path('cookie-policy/', TemplateView.as_view(template_name='cookie_policy.html'), name='cookie-policy'),
     path('disclaimer/', TemplateView.as_view(template_name='disclaimer.html'), name='disclaimer'),
+    # Sitemap index and sections (see blog/sitemaps.py)
+    path('sitemap.xml', sitemaps.index, name='sitemap-index'),
+    path('sitemap-<section>.xml', sitemaps.section, name='sitemap-section'),
 ]
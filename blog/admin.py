@@ -23,10 +23,18 @@ class TagAdmin(admin.ModelAdmin):
     search_fields = ['name']
 
 
+# Admin job list modifications
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('task', 'status', 'attempts', 'run_at', 'created_date')
+    list_filter = ['status', 'task']
+    readonly_fields = ('created_date',)
+
+
 # Model registration
 admin.site.register(models.Post, PostAdmin)
 admin.site.register(models.Tag, TagAdmin)
 admin.site.register(models.Comment, CommentAdmin)
+admin.site.register(models.Job, JobAdmin)
 
 
 # Admin general page modifications
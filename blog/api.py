@@ -0,0 +1,318 @@
+# Read-only JSON API.
+#
+# API views subclass the HTML views they mirror, so they share their
+# querysets, search parameters, conditional GET validators, page cache and
+# pagination. Rows are read as values() projections of only the requested
+# fields (?fields=title,publish_date), and list views page by cursor.
+
+from django.core.exceptions import PermissionDenied
+from django.core.files.storage import default_storage
+from django.db.models import Count, Max, Value
+from django.db.models.functions import Concat
+from django.http import Http404, JsonResponse
+from django.urls import reverse
+from django.views import generic
+
+from . import autocomplete, models, views
+from .conditional import ConditionalGetMixin
+from .pagination import CursorPaginationMixin
+
+# Full name of the author, or blank if the author was deleted.
+AUTHOR_NAME = Concat('author__first_name', Value(' '), 'author__last_name')
+
+
+class ApiError(Exception):
+    """
+    Error returned to API clients as 400 Bad Request.
+    """
+
+
+class JsonResponseMixin:
+    """
+    Mixin for API views rendering values() rows as JSON.
+
+    api_fields maps each field name to a values() lookup (or expression),
+    or to None for fields computed from the row after the query (see
+    serialize_rows()). default_fields are returned when no fields are
+    requested.
+    """
+    api_fields = {}
+    default_fields = ()
+    # Lookups always read, as needed to build the response.
+    extra_values = ()
+    fields_kwarg = 'fields'
+
+    def dispatch(self, request, *args, **kwargs):
+        """
+        Additional to base, returns errors as JSON.
+        """
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except ApiError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        except Http404:
+            return JsonResponse({'error': 'Not found'}, status=404)
+        except PermissionDenied:
+            return JsonResponse({'error': 'Forbidden'}, status=403)
+
+    def get_fields(self):
+        """
+        Returns the requested field names. Raises ApiError for unknown
+        fields.
+        """
+        requested = self.request.GET.get(self.fields_kwarg)
+        if not requested:
+            return list(self.default_fields)
+        fields = [name.strip() for name in requested.split(',')
+                  if name.strip()]
+        unknown = [name for name in fields if name not in self.api_fields]
+        if unknown:
+            raise ApiError('Unknown fields: {0}'.format(', '.join(unknown)))
+        return fields
+
+    def project(self, queryset, extra=()):
+        """
+        Returns the queryset as values() rows of the pk, the requested fields
+        and extra lookups.
+        """
+        names, expressions = ['pk', *extra], {}
+        for name in self.get_fields():
+            lookup = self.api_fields[name]
+            if lookup is None:
+                continue
+            if lookup == name:
+                names.append(name)
+            else:
+                expressions[name] = lookup
+        return queryset.prefetch_related(None).values(
+            *dict.fromkeys(names), **expressions)
+
+    def serialize_rows(self, rows):
+        """
+        Returns rows with only the requested fields, adding computed fields.
+        """
+        fields = self.get_fields()
+        if 'image' in fields:
+            for row in rows:
+                row['image'] = (default_storage.url(row['image'])
+                                if row['image'] else None)
+        if 'author_name' in fields:
+            for row in rows:
+                row['author_name'] = row['author_name'].strip() or None
+        return [{name: row.get(name) for name in fields} for row in rows]
+
+    def page_links(self, page):
+        """
+        Returns absolute (next, previous) URLs of the page's neighbours.
+        """
+        if getattr(page, 'is_cursor', False):
+            next_url = page.next_url if page.has_next() else None
+            previous_url = (page.previous_url if page.has_previous()
+                            else None)
+        else:
+            query = self.request.GET.copy()
+            next_url = previous_url = None
+            if page.has_next():
+                query[self.page_kwarg] = page.next_page_number()
+                next_url = '?' + query.urlencode()
+            if page.has_previous():
+                query[self.page_kwarg] = page.previous_page_number()
+                previous_url = '?' + query.urlencode()
+        return tuple(self.request.build_absolute_uri(url) if url else None
+                     for url in (next_url, previous_url))
+
+
+class JsonListMixin(JsonResponseMixin, CursorPaginationMixin):
+    """
+    Mixin for list API views, paginated by cursor where the ordering allows.
+    """
+
+    def is_cursor_pagination_enabled(self):
+        return True
+
+    def get_queryset(self):
+        """
+        Additional to base, projects rows of the requested fields.
+        """
+        return self.project(super().get_queryset(),
+                            (*self.extra_values, *self.cursor_fields))
+
+    def render_to_response(self, context, **response_kwargs):
+        next_url, previous_url = self.page_links(context['page_obj'])
+        return JsonResponse({
+            'results': self.serialize_rows(list(context['object_list'])),
+            'next': next_url,
+            'previous': previous_url,
+        })
+
+
+### Field sets ###
+POST_FIELDS = {
+    'id': 'id',
+    'url': None,
+    'title': 'title',
+    'subheading': 'subheading',
+    'text': 'text',
+    'author_name': AUTHOR_NAME,
+    'tags': None,
+    'image': 'image',
+    'image_width': 'image_width',
+    'image_height': 'image_height',
+    'created_date': 'created_date',
+    'publish_date': 'publish_date',
+    'edited_date': 'edited_date',
+    'num_comments': 'num_comments',
+}
+
+
+class PostFieldsMixin:
+    """
+    Mixin for post API views, adding the post URL and tags to rows.
+    """
+    api_fields = POST_FIELDS
+
+    def serialize_rows(self, rows):
+        """
+        Additional to base, adds post URLs and the tags of all rows from one
+        query.
+        """
+        fields = self.get_fields()
+        if 'url' in fields:
+            for row in rows:
+                row['url'] = self.request.build_absolute_uri(
+                    reverse('blog:post-detail', kwargs={'pk': row['pk']}))
+        if 'tags' in fields:
+            tags = {row['pk']: [] for row in rows}
+            post_tags = (models.Post.tags.through.objects
+                         .filter(post__in=tags)
+                         .values_list('post', 'tag__name', 'tag__slug')
+                         .order_by('tag__name'))
+            for post, name, slug in post_tags:
+                tags[post].append({'name': name, 'slug': slug})
+            for row in rows:
+                row['tags'] = tags[row['pk']]
+        return super().serialize_rows(rows)
+
+
+### API views ###
+class PostListApi(PostFieldsMixin, JsonListMixin, views.SearchView):
+    """
+    Published posts, with the search, tag filter and sort parameters of the
+    search page (post_input, tag_input and order_input). The post text is
+    only returned if requested.
+    """
+    default_fields = [name for name in POST_FIELDS if name != 'text']
+
+
+class PostDetailApi(PostFieldsMixin, JsonResponseMixin, views.PostDisplay):
+    """
+    A post, visible if published or to its author.
+    """
+    default_fields = list(POST_FIELDS)
+    extra_values = ('publish_date', 'author')
+
+    def get_object(self):
+        """
+        Returns the post row. Raises PermissionDenied for drafts of other
+        users.
+        """
+        row = self.project(models.Post.objects.filter(
+            pk=self.kwargs.get('pk')), self.extra_values).first()
+        if row is None:
+            raise Http404('Post not found')
+        # Drafts are only visible to their author (not to anonymous users
+        # when the author was deleted).
+        user = self.request.user
+        if row['publish_date'] is None and not (
+                user.is_authenticated and row['author'] == user.pk):
+            raise PermissionDenied()
+        return row
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse(self.serialize_rows([self.get_object()])[0])
+
+
+class TagListApi(JsonListMixin, views.TagListView):
+    """
+    Tags, with the search and sort parameters of the tag list page
+    (name_input and order_input). The overview text is only returned if
+    requested.
+    """
+    api_fields = {
+        'id': 'id',
+        'url': None,
+        'name': 'name',
+        'slug': 'slug',
+        'subheading': 'subheading',
+        'overview': 'overview',
+        'image': 'image',
+        'image_width': 'image_width',
+        'image_height': 'image_height',
+        'num_posts': 'num_posts',
+    }
+    default_fields = [name for name in api_fields if name != 'overview']
+    extra_values = ('slug',)
+    cursor_fields = ('num_posts',)
+
+    def serialize_rows(self, rows):
+        """
+        Additional to base, adds tag URLs.
+        """
+        if 'url' in self.get_fields():
+            for row in rows:
+                row['url'] = self.request.build_absolute_uri(reverse(
+                    'blog:tag-overview', kwargs={'slug': row['slug']}))
+        return super().serialize_rows(rows)
+
+
+class TagAutocompleteApi(JsonResponseMixin, generic.View):
+    """
+    Names and slugs of the tags whose name, or a word of it, starts with q,
+    answered from the process's tag index. The only cache read is the
+    index's periodic version check.
+    """
+
+    def get_limit(self):
+        """
+        Returns the requested number of results. Raises ApiError if invalid.
+        """
+        limit = self.request.GET.get('limit', autocomplete.DEFAULT_LIMIT)
+        try:
+            limit = int(limit)
+        except (TypeError, ValueError):
+            raise ApiError('Invalid limit')
+        if not 1 <= limit <= autocomplete.MAX_LIMIT:
+            raise ApiError('Limit must be between 1 and {0}'.format(
+                autocomplete.MAX_LIMIT))
+        return limit
+
+    def get(self, request, *args, **kwargs):
+        tags = autocomplete.index.search(request.GET.get('q', ''),
+                                         self.get_limit())
+        return JsonResponse({'results': [{'name': name, 'slug': slug}
+                                         for name, slug in tags]})
+
+
+class CommentListApi(JsonListMixin, ConditionalGetMixin,
+                     views.CommentListView):
+    """
+    A post's comments, newest first.
+    """
+    api_fields = {
+        'id': 'id',
+        'text': 'text',
+        'author_name': AUTHOR_NAME,
+        'created_date': 'created_date',
+        'edited_date': 'edited_date',
+    }
+    default_fields = list(api_fields)
+
+    def get_validators(self):
+        """
+        Returns the latest dates and number of the post's comments.
+        """
+        return models.Comment.objects.filter(
+            post=self.kwargs.get('pk')).aggregate(
+                latest_comment=Max('created_date'),
+                latest_comment_edit=Max('edited_date'),
+                num_comments=Count('pk'))
@@ -3,3 +3,10 @@ from django.apps import AppConfig
 
 class BlogConfig(AppConfig):
     name = 'blog'
+
+    def ready(self):
+        """
+        Connects signal receivers and installs the timing hooks.
+        """
+        from . import signals, timing
+        timing.install()
@@ -0,0 +1,217 @@
+# Blog archives for the export_blog and import_blog commands.
+#
+# An archive is newline-delimited JSON (NDJSON), one record per line:
+#
+#     {"model": "blog.post", "pk": 1, "fields": {"title": ..., ...}}
+#
+# Records are written model by model in SECTIONS order and by pk, so
+# related records are always imported after the records they refer to.
+# Authors are referenced by username and images by storage path (image
+# files are not included). Rows are read with values() iterators and
+# written or imported in chunks, so memory use does not grow with the size
+# of the archive.
+
+import json
+from itertools import groupby, islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from . import cache, models, search, sitemaps
+
+User = get_user_model()
+
+# Archive sections in import order: (label, model, fields). The author
+# field is stored as the author's username.
+SECTIONS = [
+    ('blog.tag', models.Tag,
+     ('name', 'slug', 'subheading', 'image', 'image_width', 'image_height',
+      'overview')),
+    ('blog.post', models.Post,
+     ('author', 'title', 'subheading', 'image', 'image_width',
+      'image_height', 'created_date', 'publish_date', 'edited_date',
+      'text')),
+    ('blog.post_tags', models.Post.tags.through, ('post', 'tag')),
+    ('blog.comment', models.Comment,
+     ('post', 'author', 'created_date', 'edited_date', 'text')),
+]
+
+LABELS = [label for label, model, fields in SECTIONS]
+
+
+def encode_value(value):
+    """
+    JSON encoder for dates, keeping full precision (DjangoJSONEncoder rounds
+    times to milliseconds).
+    """
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError('{0!r} is not JSON serializable'.format(value))
+
+
+def export_records(start=None, chunk_size=500):
+    """
+    Yields archive lines for every record, optionally starting after the
+    record (label, pk).
+    """
+    start_index, start_pk = 0, None
+    if start is not None:
+        start_index, start_pk = LABELS.index(start[0]), start[1]
+
+    for index, (label, model, fields) in enumerate(SECTIONS):
+        if index < start_index:
+            continue
+        lookups = [field + '__username' if field == 'author' else field
+                   for field in fields]
+        queryset = model.objects.order_by('pk').values('pk', *lookups)
+        if index == start_index and start_pk is not None:
+            queryset = queryset.filter(pk__gt=start_pk)
+
+        for row in queryset.iterator(chunk_size=chunk_size):
+            record = {
+                'model': label,
+                'pk': row['pk'],
+                'fields': {field: row[lookup]
+                           for field, lookup in zip(fields, lookups)},
+            }
+            yield json.dumps(record, default=encode_value) + '\n'
+
+
+def last_record(path):
+    """
+    Returns (label, pk) of the last complete record in an archive file, or
+    None if there is none. A partly written last line is removed.
+    """
+    with open(path, 'rb+') as f:
+        f.seek(0, 2)
+        end = f.tell()
+        # Read back from the end until two line breaks are found.
+        block = b''
+        while end > 0 and block.count(b'\n') < 2:
+            size = min(4096, end)
+            end -= size
+            f.seek(end)
+            block = f.read(size) + block
+        complete, newline, partial = block.rpartition(b'\n')
+        if partial:
+            f.truncate(end + len(complete) + len(newline))
+        lines = complete.split(b'\n')
+        if not lines[-1]:
+            return None
+        record = json.loads(lines[-1])
+        return record['model'], record['pk']
+
+
+def read_records(lines):
+    """
+    Yields archive records from lines, skipping blank lines.
+    """
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+class Importer:
+    """
+    Imports archive records in chunks with bulk_create, keeping their pks.
+
+    Records whose pk already exists are skipped, so an interrupted import
+    can be resumed by running it again on the same archive.
+    """
+
+    def __init__(self, chunk_size=500):
+        self.chunk_size = chunk_size
+        self.sections = {label: (model, fields)
+                         for label, model, fields in SECTIONS}
+        self.users = {}
+        self.created = dict.fromkeys(LABELS, 0)
+        self.skipped = dict.fromkeys(LABELS, 0)
+
+    def get_user_id(self, username):
+        """
+        Returns the id of the user with username, creating the user (with no
+        usable password) if they do not exist.
+        """
+        if username is None:
+            return None
+        if username not in self.users:
+            user, created = User.objects.get_or_create(
+                username=username,
+                defaults={'password': make_password(None)})
+            self.users[username] = user.pk
+        return self.users[username]
+
+    def build(self, model, fields, record):
+        """
+        Returns an unsaved model instance for the record.
+        """
+        values = {'pk': record['pk']}
+        for name in fields:
+            value = record['fields'].get(name)
+            if name == 'author':
+                values['author_id'] = self.get_user_id(value)
+            elif name in ('post', 'tag'):
+                values[name + '_id'] = value
+            else:
+                values[name] = model._meta.get_field(name).to_python(value)
+        return model(**values)
+
+    def import_chunk(self, label, records):
+        """
+        Creates the records of one chunk that do not exist yet.
+        """
+        model, fields = self.sections[label]
+        existing = set(model.objects.filter(
+            pk__in=[record['pk'] for record in records]
+        ).values_list('pk', flat=True))
+        objs = [self.build(model, fields, record) for record in records
+                if record['pk'] not in existing]
+
+        with transaction.atomic():
+            model.objects.bulk_create(objs)
+            # bulk_create skips save(), so search vectors are set here.
+            if model is models.Post:
+                for obj in objs:
+                    search.update_search_vector(obj)
+
+        self.created[label] += len(objs)
+        self.skipped[label] += len(existing)
+
+    def run(self, records):
+        """
+        Imports the records, then updates stored counts, database sequences
+        and caches.
+        """
+        for label, section in groupby(records, key=lambda r: r['model']):
+            if label not in self.sections:
+                raise ValueError('Unknown model: {0}'.format(label))
+            while True:
+                chunk = list(islice(section, self.chunk_size))
+                if not chunk:
+                    break
+                self.import_chunk(label, chunk)
+        self.finish()
+
+    def finish(self):
+        """
+        Recalculates counts kept by signals (not sent by bulk_create), moves
+        pk sequences past the imported pks and invalidates cached pages.
+        """
+        models.Tag.objects.all().update_num_posts()
+        models.Post.objects.all().update_num_comments()
+
+        sequence_sql = connection.ops.sequence_reset_sql(
+            no_style(), [model for label, model, fields in SECTIONS])
+        with connection.cursor() as cursor:
+            for sql in sequence_sql:
+                cursor.execute(sql)
+
+        cache.bump_version(cache.PAGES)
+        cache.bump_version(cache.FEEDS)
+        cache.bump_version(cache.COMMENTS)
+        cache.bump_version(cache.TAGS)
+        for section in sitemaps.SITEMAPS:
+            cache.bump_version(sitemaps.section_namespace(section))
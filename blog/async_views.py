@@ -0,0 +1,105 @@
+# Async views for ASGI deployments (see amblog/asgi.py), used in place of
+# the landing and post detail views when BLOG_ASYNC_VIEWS is set.
+#
+# The Django 3.1 ASGI handler runs sync views one at a time in a single
+# thread. These views run the sync view in a thread of its own instead, and
+# evaluate the page's independent queries (see ContextQueriesMixin)
+# concurrently, each in another thread, as the ORM cannot be used from
+# async code. Request signals only check the handler thread's database
+# connection, so each thread checks its own before and after use (closing
+# it unless CONN_MAX_AGE keeps it open).
+
+import asyncio
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.db import close_old_connections
+
+from . import views
+
+
+def in_thread(func):
+    """
+    Returns an async function calling func in a thread pool thread.
+    """
+    def call(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(call, thread_sensitive=False)
+
+
+def evaluate(query):
+    """
+    Returns the result of a callable, or the rows of a queryset.
+    """
+    return query() if callable(query) else list(query)
+
+
+async def gather_queries(queries):
+    """
+    Evaluates queries concurrently, returning their results by name.
+    """
+    results = await asyncio.gather(
+        *(in_thread(evaluate)(query) for query in queries.values()))
+    return dict(zip(queries, results))
+
+
+class ConcurrentQueriesMixin:
+    """
+    Mixin for ContextQueriesMixin views evaluating their context queries
+    concurrently.
+    """
+
+    def evaluate_queries(self, queries):
+        return async_to_sync(gather_queries)(queries)
+
+
+class AsyncLandingPage(ConcurrentQueriesMixin, views.LandingPage):
+    pass
+
+
+class AsyncPostDisplay(ConcurrentQueriesMixin, views.PostDisplay):
+
+    def get(self, request, *args, **kwargs):
+        """
+        Loads the post concurrently with the context queries, which only
+        depend on the post pk.
+        """
+        self.query_results = self.evaluate_queries(
+            {'object': self.get_object, **self.get_context_queries()})
+        self.object = self.query_results.pop('object')
+        context = self.get_context_data(object=self.object)
+        return self.render_to_response(context)
+
+
+class AsyncPostDetailView(views.PostDetailView):
+
+    def get(self, *args, **kwargs):
+        view = AsyncPostDisplay.as_view()
+        return view(self.request, *args, **kwargs)
+
+
+def as_async_view(view_class):
+    """
+    Returns an async view function running the view class (and rendering
+    its response) in a thread.
+    """
+    view = view_class.as_view()
+
+    def render(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render') and callable(response.render):
+            response = response.render()
+        return response
+
+    async def async_view(request, *args, **kwargs):
+        return await in_thread(render)(request, *args, **kwargs)
+
+    async_view.view_class = view_class
+    return async_view
+
+
+landing = as_async_view(AsyncLandingPage)
+post_detail = as_async_view(AsyncPostDetailView)
@@ -0,0 +1,108 @@
+# Tag name autocomplete.
+#
+# Each process keeps a sorted index of the words of every tag name, and
+# answers prefix queries with a binary search rather than a database query.
+# The index is built from the cached tag list, and rebuilt when a tag is
+# saved or deleted (see signals.py). Other processes check the TAGS
+# namespace version in the shared cache (a database read with the
+# DatabaseCache backend) at most every VERSION_CHECK_INTERVAL seconds, and
+# rebuild their index once it has been bumped.
+
+import bisect
+import threading
+import time
+
+from . import cache
+
+# Default and maximum number of suggestions returned.
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+# Seconds between checks of the shared tag list version.
+VERSION_CHECK_INTERVAL = 5
+
+
+def normalize(text):
+    return ' '.join(text.casefold().split())
+
+
+class TagIndex:
+    """
+    Prefix index over tag names. Matches the start of the name or of any
+    word in it, so "pow" suggests both "Power" and "Solar power".
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        # Monotonic time the version was last checked.
+        self.checked_at = None
+        # Sorted (key, name, slug) entries, one per word of each name; the
+        # key is the normalized name from that word on.
+        self.entries = []
+        self.keys = []
+
+    def build(self, version):
+        entries = []
+        for pk, name, slug in cache.get_tags():
+            words = normalize(name).split(' ')
+            for i in range(len(words)):
+                entries.append((' '.join(words[i:]), name, slug))
+        entries.sort()
+        self.entries = entries
+        self.keys = [entry[0] for entry in entries]
+        self.version = version
+
+    def clear(self):
+        """
+        Has the index rebuilt on its next query.
+        """
+        self.version = None
+        self.checked_at = None
+
+    def current_version(self):
+        """
+        Returns the shared tag list version, read from the cache if not
+        checked within VERSION_CHECK_INTERVAL seconds.
+        """
+        now = time.monotonic()
+        if (self.checked_at is None
+                or now - self.checked_at >= VERSION_CHECK_INTERVAL):
+            self.checked_at = now
+            return cache.get_version(cache.TAGS)
+        return self.version
+
+    def search(self, prefix, limit=DEFAULT_LIMIT):
+        """
+        Returns up to limit tags, as (name, slug), whose name or a word of
+        it starts with prefix. Names matching from their start come first,
+        then the rest in name order.
+        """
+        prefix = normalize(prefix)
+        if not prefix or limit < 1:
+            return []
+        with self.lock:
+            version = self.current_version()
+            if self.version != version:
+                self.build(version)
+            entries, keys = self.entries, self.keys
+
+        # Keys starting with prefix sort between prefix and prefix followed
+        # by the highest code point.
+        start = bisect.bisect_left(keys, prefix)
+        end = bisect.bisect_left(keys, prefix + '\U0010ffff', start)
+        matches = {name: slug for key, name, slug in entries[start:end]}
+        ranked = sorted(matches, key=lambda name: (
+            not normalize(name).startswith(prefix), name.casefold()))
+        return [(name, matches[name]) for name in ranked[:limit]]
+
+
+index = TagIndex()
+
+
+def invalidate():
+    """
+    Has every process rebuild its tag index.
+    """
+    index.clear()
+    cache.bump_version(cache.TAGS)
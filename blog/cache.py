@@ -0,0 +1,247 @@
+# Caching helpers.
+#
+# Cached entries are grouped into namespaces, each with a version number
+# stored in the cache. The version is part of every key in the namespace, so
+# bumping it invalidates all of the namespace's entries at once; stale
+# entries are left to expire.
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe, quote_etag
+
+from . import models
+
+# Namespace for anonymous full-page cache entries.
+PAGES = 'pages'
+
+# Namespace for syndication feed bodies.
+FEEDS = 'feeds'
+
+# Namespace for the latest comments shown on each post's page.
+COMMENTS = 'comments'
+
+# Namespace for the list of tags shown in search forms and indexed for
+# autocomplete (see autocomplete.py).
+TAGS = 'tags'
+
+# Number of comments shown on a post's page, and seconds they are cached for.
+LATEST_COMMENTS = 10
+LATEST_COMMENTS_TIMEOUT = 60 * 60 * 24
+
+# Response headers stored with cached pages.
+CACHED_HEADERS = ('Cache-Control', 'Content-Type', 'ETag', 'Last-Modified',
+                  'X-Robots-Tag')
+
+
+def version_key(namespace):
+    return 'blog:version:{0}'.format(namespace)
+
+
+def get_version(namespace):
+    """
+    Returns the current version of the namespace.
+    """
+    key = version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        # Versions start from the current time so a version lost from the
+        # cache (e.g. culled) is not reused with stale entries still present.
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(namespace):
+    """
+    Invalidates every entry in the namespace.
+    """
+    key = version_key(namespace)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, int(time.time() * 1000), None)
+
+
+def make_key(namespace, *parts):
+    """
+    Returns a cache key for parts in the current version of the namespace.
+    """
+    digest = hashlib.md5(
+        '\n'.join(str(part) for part in parts).encode()).hexdigest()
+    return 'blog:{0}:{1}:{2}'.format(
+        namespace, get_version(namespace), digest)
+
+
+def request_origin(request):
+    """
+    Returns the scheme and host of the request, part of the cache key of
+    responses containing absolute URLs built from the request.
+    """
+    return '{0}://{1}'.format(request.scheme, request.get_host())
+
+
+def get_latest_comments(post_pk):
+    """
+    Returns the newest comments of the post with pk post_pk with their
+    authors, cached per post until a comment on the post changes (see
+    signals.py).
+    """
+    key = make_key(COMMENTS, post_pk)
+    comments = cache.get(key)
+    if comments is None:
+        # Only the author fields shown are loaded, so password hashes and
+        # other user details are not stored in the cache.
+        comments = list(
+            models.Comment.objects
+            .filter(post=post_pk)
+            .select_related('author')
+            .only('post', 'created_date', 'edited_date', 'text',
+                  'author__first_name', 'author__last_name')
+            .order_by('-created_date', '-id')[:LATEST_COMMENTS])
+        cache.set(key, comments, LATEST_COMMENTS_TIMEOUT)
+    return comments
+
+
+def invalidate_latest_comments(post_pk):
+    """
+    Removes the cached latest comments of a post.
+    """
+    cache.delete(make_key(COMMENTS, post_pk))
+
+
+def get_tags():
+    """
+    Returns (pk, name, slug) of every tag, ordered by name, cached until a
+    tag is created, updated or deleted (see signals.py).
+    """
+    key = make_key(TAGS, 'list')
+    tags = cache.get(key)
+    if tags is None:
+        tags = list(models.Tag.objects.order_by('name')
+                    .values_list('pk', 'name', 'slug'))
+        cache.set(key, tags, None)
+    return tags
+
+
+def get_tag(name=None, slug=None):
+    """
+    Returns an unsaved tag holding the pk, name and slug of the cached tag
+    with the name (matched case-insensitively) or slug. Raises
+    Tag.DoesNotExist if there is none.
+    """
+    if name is not None:
+        name = name.casefold()
+    for pk, tag_name, tag_slug in get_tags():
+        if tag_slug == slug or tag_name.casefold() == name:
+            return models.Tag(pk=pk, name=tag_name, slug=tag_slug)
+    raise models.Tag.DoesNotExist('Tag not found')
+
+
+def normalize_query_string(query_dict):
+    """
+    Returns the query string with parameters sorted, so equivalent URLs share
+    a cache entry. CSRF tokens from old GET search forms are dropped.
+    """
+    params = sorted(
+        (key, value) for key, values in query_dict.lists()
+        for value in values if key != 'csrfmiddlewaretoken')
+    return '&'.join('{0}={1}'.format(key, value) for key, value in params)
+
+
+def get_page(request, key):
+    """
+    Returns a response for the page cached at key, or None.
+    """
+    cached = cache.get(key)
+    if cached is None:
+        return None
+    content, headers = cached
+    response = HttpResponse(content)
+    for header, value in headers.items():
+        response[header] = value
+    return conditional_response(request, response)
+
+
+def store_page(request, key, response):
+    """
+    Adds an ETag (a hash of the content) to a rendered response, caches it
+    at key and returns it, or 304 Not Modified for a matching conditional
+    request.
+    """
+    if not response.has_header('ETag'):
+        response['ETag'] = quote_etag(
+            hashlib.md5(response.content).hexdigest())
+    if settings.BLOG_PAGE_CACHE_TIMEOUT:
+        set_page(key, response, settings.BLOG_PAGE_CACHE_TIMEOUT)
+    return conditional_response(request, response)
+
+
+def conditional_response(request, response):
+    """
+    Returns 304 Not Modified (or 412 Precondition Failed) for a conditional
+    request matching the response's ETag or Last-Modified headers, else the
+    response.
+    """
+    return get_conditional_response(
+        request, etag=response.get('ETag'),
+        last_modified=parse_http_date_safe(response.get('Last-Modified', '')),
+        response=response)
+
+
+def set_page(key, response, timeout):
+    """
+    Caches the content and CACHED_HEADERS of a rendered response at key.
+    """
+    headers = {header: response[header] for header in CACHED_HEADERS
+               if response.has_header(header)}
+    cache.set(key, (response.content, headers), timeout)
+
+
+class AnonymousPageCacheMixin:
+    """
+    Mixin for views caching the rendered page for anonymous GET requests.
+
+    Pages are keyed by scheme, host, path and normalised query string, and
+    are invalidated by bumping the PAGES namespace version when blog content
+    changes (see signals.py). Logged in users and requests with pending messages are
+    never served from or stored in the cache.
+    """
+
+    def is_page_cacheable(self, request):
+        return (settings.BLOG_PAGE_CACHE_TIMEOUT
+                and request.method in ('GET', 'HEAD')
+                and not request.user.is_authenticated
+                and not len(messages.get_messages(request)))
+
+    def dispatch(self, request, *args, **kwargs):
+        """
+        Additional to base, serves and stores anonymous pages in the cache.
+        """
+        if not self.is_page_cacheable(request):
+            return super().dispatch(request, *args, **kwargs)
+
+        # API responses and page links may be absolute URLs built from the
+        # request.
+        key = make_key(PAGES, request_origin(request), request.path,
+                       normalize_query_string(request.GET))
+        response = get_page(request, key)
+        if response is not None:
+            return response
+
+        response = super().dispatch(request, *args, **kwargs)
+
+        def store(response):
+            if response.status_code == 200 and not response.cookies:
+                set_page(key, response, settings.BLOG_PAGE_CACHE_TIMEOUT)
+
+        if hasattr(response, 'render') and not response.is_rendered:
+            response.add_post_render_callback(store)
+        else:
+            store(response)
+        return response
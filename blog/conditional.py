@@ -0,0 +1,83 @@
+# Conditional GET support (ETag / 304 Not Modified).
+#
+# Views compute their validators from a single aggregate query before any
+# rendering, so revalidating clients get a 304 without the page being built.
+# Pages carry no Last-Modified date: content dates do not change when posts
+# or comments are deleted or tags renamed, so only the ETag (which includes
+# the PAGES version) is used, and Cache-Control: no-cache has browsers
+# revalidate rather than guess a freshness lifetime.
+
+import hashlib
+
+from django.contrib import messages
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+
+from . import cache
+
+
+class ConditionalGetMixin:
+    """
+    Mixin for views adding ETag and Cache-Control headers to GET responses
+    and answering matching conditional requests with 304 Not Modified.
+
+    Views implement get_validators(), returning a dict of values that change
+    whenever the page content changes (or None to skip conditional handling).
+    """
+
+    def get_validators(self):
+        raise NotImplementedError(
+            'ConditionalGetMixin requires get_validators()')
+
+    def get_etag(self, validators):
+        """
+        Returns an ETag for the page from its validators, the requesting user
+        and the blog content version (which covers changes, such as tag
+        edits, not reflected in the validators).
+        """
+        user = self.request.user
+        parts = [
+            self.request.get_full_path(),
+            cache.get_version(cache.PAGES),
+            '{0}:{1}'.format(user.pk, user.is_staff)
+            if user.is_authenticated else 'anonymous',
+        ]
+        parts += ['{0}={1}'.format(key, validators[key])
+                  for key in sorted(validators)]
+        return quote_etag(hashlib.md5('\n'.join(
+            str(part) for part in parts).encode()).hexdigest())
+
+    def add_cache_control(self, response):
+        """
+        Has clients revalidate the response before each use. Pages of logged
+        in users are not stored by shared caches.
+        """
+        if self.request.user.is_authenticated:
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(response, no_cache=True)
+
+    def dispatch(self, request, *args, **kwargs):
+        """
+        Additional to base, handles conditional GET requests.
+        """
+        # Pages showing pending messages are never treated as unmodified.
+        if (request.method not in ('GET', 'HEAD')
+                or len(messages.get_messages(request))):
+            return super().dispatch(request, *args, **kwargs)
+
+        validators = self.get_validators()
+        if validators is None:
+            return super().dispatch(request, *args, **kwargs)
+
+        etag = self.get_etag(validators)
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            self.add_cache_control(response)
+            return response
+
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200:
+            response.setdefault('ETag', etag)
+            self.add_cache_control(response)
+        return response
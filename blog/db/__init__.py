@@ -0,0 +1,268 @@
+# Database connection handling: health checks of persistent connections
+# and an optional in-process connection pool, added to Django's database
+# backends by DatabaseWrapperMixin (see backends/).
+#
+# Settings, per database in DATABASES:
+#
+#     'CONN_HEALTH_CHECKS': True,
+#         Check a persistent connection (CONN_MAX_AGE) works the first time
+#         it is used in each request, reconnecting if it does not.
+#     'POOL': {'MAX_SIZE': 10, 'TIMEOUT': 10, 'MAX_AGE': 600},
+#         Share up to MAX_SIZE connections between the threads of a
+#         process. Connections are checked out when first used in a request
+#         and returned when Django closes them (set CONN_MAX_AGE to 0), and
+#         are checked before reuse. Threads wait up to TIMEOUT seconds for a
+#         free connection. Connections are reopened after MAX_AGE seconds.
+#
+# Connection checkout times and pool use are logged to the blog.metrics
+# logger.
+
+import logging
+import threading
+import time
+
+metrics = logging.getLogger('blog.metrics')
+
+# Pools by database alias, shared by the threads of a process.
+pools = {}
+pools_lock = threading.Lock()
+
+
+class PoolTimeout(Exception):
+    """
+    Raised when no pooled connection is free within the pool timeout.
+    """
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of up to max_size connections.
+    """
+
+    def __init__(self, max_size=10, timeout=10, max_age=600):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_age = max_age
+        self.condition = threading.Condition()
+        # Idle connections with the time they were opened, most recently
+        # returned last.
+        self.idle = []
+        self.opened = {}
+        self.in_use = 0
+        self.waiting = 0
+        self.checkouts = 0
+        self.timeouts = 0
+
+    @property
+    def size(self):
+        return len(self.opened)
+
+    def acquire(self, connect, validate=None):
+        """
+        Returns a free connection, opening one with connect() if the pool is
+        not full, or waits for one to be released. Raises PoolTimeout after
+        timeout seconds.
+
+        Idle connections are reused if validate(connection) (if given)
+        returns True, and closed otherwise.
+        """
+        start = time.monotonic()
+        while True:
+            conn = self.checkout(start)
+            if conn is None:
+                # Room for a new connection was reserved.
+                try:
+                    conn = connect()
+                except Exception:
+                    with self.condition:
+                        self.in_use -= 1
+                        self.condition.notify()
+                    raise
+                with self.condition:
+                    self.opened[conn] = time.monotonic()
+                break
+            if (time.monotonic() - self.opened[conn] < self.max_age
+                    and (validate is None or validate(conn))):
+                break
+            self.discard(conn)
+            # The connection was discarded, so one can be opened.
+
+        waited = time.monotonic() - start
+        metrics.info(
+            'db_checkout checkout_ms=%.1f in_use=%d size=%d max_size=%d',
+            waited * 1000, self.in_use, self.size, self.max_size)
+        return conn
+
+    def checkout(self, start):
+        """
+        Takes an idle connection, or reserves room for a new one (returning
+        None), waiting until one is free.
+        """
+        with self.condition:
+            while not self.idle and self.in_use >= self.max_size:
+                remaining = self.timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    self.timeouts += 1
+                    metrics.warning(
+                        'db_pool_timeout in_use=%d max_size=%d waiting=%d',
+                        self.in_use, self.max_size, self.waiting)
+                    raise PoolTimeout(
+                        'No database connection free after {0} seconds '
+                        '({1} in use)'.format(self.timeout, self.in_use))
+                self.waiting += 1
+                try:
+                    self.condition.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            self.in_use += 1
+            self.checkouts += 1
+            if self.idle:
+                return self.idle.pop()
+            return None
+
+    def release(self, conn):
+        """
+        Returns a connection to the pool, rolling back any open transaction.
+        """
+        try:
+            conn.rollback()
+        except Exception:
+            self.discard(conn)
+            return
+        with self.condition:
+            self.in_use -= 1
+            self.idle.append(conn)
+            self.condition.notify()
+
+    def discard(self, conn):
+        """
+        Closes a checked out connection, freeing its place in the pool.
+        """
+        with self.condition:
+            self.opened.pop(conn, None)
+            self.in_use -= 1
+            self.condition.notify()
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def close(self):
+        """
+        Closes the idle connections.
+        """
+        with self.condition:
+            idle, self.idle = self.idle, []
+            for conn in idle:
+                self.opened.pop(conn, None)
+        for conn in idle:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def stats(self):
+        """
+        Returns the pool's current use and totals since it was created.
+        """
+        with self.condition:
+            return {
+                'size': self.size,
+                'max_size': self.max_size,
+                'in_use': self.in_use,
+                'idle': len(self.idle),
+                'waiting': self.waiting,
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+            }
+
+
+class DatabaseWrapperMixin:
+    """
+    Mixin for database backend wrappers adding the CONN_HEALTH_CHECKS and
+    POOL settings.
+    """
+    health_check_done = False
+
+    def get_pool(self):
+        """
+        Returns the process's pool for the database, or None if pooling is
+        disabled.
+        """
+        options = self.settings_dict.get('POOL')
+        if not options:
+            return None
+        with pools_lock:
+            if self.alias not in pools:
+                pools[self.alias] = ConnectionPool(
+                    max_size=options.get('MAX_SIZE', 10),
+                    timeout=options.get('TIMEOUT', 10),
+                    max_age=options.get('MAX_AGE', 600))
+            return pools[self.alias]
+
+    def is_connection_usable(self, conn):
+        """
+        Returns whether a raw connection still works.
+        """
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute('SELECT 1')
+            finally:
+                cursor.close()
+        except self.Database.Error:
+            return False
+        return True
+
+    def get_new_connection(self, conn_params):
+        """
+        Additional to base, checks connections out of the pool.
+        """
+        pool = self.get_pool()
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        try:
+            return pool.acquire(
+                lambda: super(DatabaseWrapperMixin, self).get_new_connection(
+                    conn_params),
+                self.is_connection_usable)
+        except PoolTimeout as e:
+            raise self.Database.OperationalError(str(e)) from e
+
+    def _close(self):
+        """
+        Additional to base, returns pooled connections to the pool.
+        """
+        pool = self.get_pool()
+        if pool is None or self.connection is None:
+            return super()._close()
+        if self.errors_occurred:
+            pool.discard(self.connection)
+        else:
+            pool.release(self.connection)
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def close_if_unusable_or_obsolete(self):
+        """
+        Additional to base, has the connection checked when it is next used
+        (at the start of each request).
+        """
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
+
+    def ensure_connection(self):
+        """
+        Additional to base, reconnects if a persistent connection no longer
+        works, on its first use in a request.
+        """
+        if (self.connection is not None
+                and self.settings_dict.get('CONN_HEALTH_CHECKS')
+                and not self.health_check_done
+                and not self.in_atomic_block):
+            self.health_check_done = True
+            if not self.is_usable():
+                self.close()
+        super().ensure_connection()
@@ -0,0 +1,7 @@
+from django.db.backends.postgresql import base
+
+from blog.db import DatabaseWrapperMixin
+
+
+class DatabaseWrapper(DatabaseWrapperMixin, base.DatabaseWrapper):
+    pass
@@ -0,0 +1,10 @@
+# SQLite backend with the connection settings of blog.db, for local testing
+# of health checks and pooling against a database file.
+
+from django.db.backends.sqlite3 import base
+
+from blog.db import DatabaseWrapperMixin
+
+
+class DatabaseWrapper(DatabaseWrapperMixin, base.DatabaseWrapper):
+    pass
@@ -0,0 +1,124 @@
+# RSS and Atom feeds of the latest BLOG_FEED_ITEMS published posts, for all
+# posts and for each tag.
+#
+# Generated feeds are cached until a post or tag changes (the FEEDS
+# namespace is bumped in signals.py) and carry an ETag header, so
+# aggregators polling a feed are answered from the cache or with 304 Not
+# Modified. Feeds carry no Last-Modified date, as the latest item date does
+# not change when a post is deleted or back-dated.
+
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+
+from . import cache, models
+
+
+class CachedFeedMixin:
+    """
+    Mixin for feeds caching the generated feed body and answering
+    conditional requests.
+    """
+
+    def __call__(self, request, *args, **kwargs):
+        """
+        Additional to base, serves and stores the feed in the cache.
+        """
+        # Feeds link to the host and scheme requested.
+        key = cache.make_key(cache.FEEDS, cache.request_origin(request),
+                             request.path)
+        response = cache.get_page(request, key)
+        if response is not None:
+            return response
+
+        response = super().__call__(request, *args, **kwargs)
+        del response['Last-Modified']
+        return cache.store_page(request, key, response)
+
+
+class LatestPostsRSSFeed(CachedFeedMixin, Feed):
+    """
+    RSS feed of the latest published posts, newest first.
+    """
+    title = "Alison's Blog"
+    description = 'Latest posts from Alison Mungall.'
+
+    def link(self):
+        return reverse('blog:landing')
+
+    def get_posts(self):
+        """
+        Returns published posts, newest first, with only the fields used.
+        """
+        return (models.Post.objects
+                .filter(publish_date__isnull=False)
+                .select_related('author')
+                .only('title', 'subheading', 'publish_date', 'edited_date',
+                      'author__first_name', 'author__last_name')
+                .order_by('-publish_date', '-id'))
+
+    def items(self):
+        """
+        Returns the latest published posts.
+        """
+        return self.get_posts()[:settings.BLOG_FEED_ITEMS]
+
+    def item_title(self, item):
+        return item.title
+
+    def item_description(self, item):
+        return item.subheading or ''
+
+    def item_author_name(self, item):
+        if item.author is not None:
+            return item.author.get_full_name()
+
+    def item_pubdate(self, item):
+        return item.publish_date
+
+    def item_updateddate(self, item):
+        return item.edited_date or item.publish_date
+
+
+class LatestPostsAtomFeed(LatestPostsRSSFeed):
+    """
+    Atom feed of the latest published posts, newest first.
+    """
+    feed_type = Atom1Feed
+    subtitle = LatestPostsRSSFeed.description
+
+
+class TagPostsRSSFeed(LatestPostsRSSFeed):
+    """
+    RSS feed of the latest published posts of a tag, newest first.
+    """
+
+    def get_object(self, request, slug):
+        return get_object_or_404(models.Tag, slug=slug)
+
+    def title(self, obj):
+        return "Alison's Blog: {0}".format(obj.name)
+
+    def description(self, obj):
+        return obj.subheading
+
+    def link(self, obj):
+        return obj.get_absolute_url()
+
+    def items(self, obj):
+        """
+        Returns the tag's latest published posts.
+        """
+        return self.get_posts().filter(tags=obj)[:settings.BLOG_FEED_ITEMS]
+
+
+class TagPostsAtomFeed(TagPostsRSSFeed):
+    """
+    Atom feed of the latest published posts of a tag, newest first.
+    """
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return obj.subheading
@@ -1,6 +1,8 @@
 from django import forms
+from django.conf import settings
+from django.urls import reverse_lazy
 
-from . import models
+from . import cache, models
 
 
 class TagForm(forms.ModelForm):
@@ -85,21 +87,103 @@ class CommentForm(forms.ModelForm):
                                                  'placeholder': 'Write a comment...'})
 
 
-class SearchPostForm(forms.Form):
+class TagAutocompleteInput(forms.TextInput):
+    """
+    Text input suggesting tag names from the tag autocomplete API as the
+    user types.
+    """
+
+    class Media:
+        js = ('blog/js/tag_autocomplete.js',)
+
+    def __init__(self, attrs=None):
+        super().__init__({
+            'class': 'rounded-0 form-control',
+            'placeholder': 'All',
+            'autocomplete': 'off',
+            'data-autocomplete-url': reverse_lazy('blog:api-tag-autocomplete'),
+            **(attrs or {}),
+        })
+
+
+class TagFieldMixin:
+    """
+    Mixin for fields of a tag by name, cleaned to the tag (or None if blank)
+    from the cached tag list rather than the database.
+    """
+
+    def clean(self, value):
+        name = super().clean(value)
+        if not name:
+            return None
+        try:
+            return cache.get_tag(name=name)
+        except models.Tag.DoesNotExist:
+            raise forms.ValidationError(self.error_messages['invalid_choice'],
+                                        code='invalid_choice',
+                                        params={'value': name})
+
+
+class TagNameField(TagFieldMixin, forms.CharField):
+    """
+    Text input of a tag name, suggesting names as the user types.
+    """
+    widget = TagAutocompleteInput
+    default_error_messages = {
+        'invalid_choice': 'No topic is named %(value)s.',
+    }
+
+    def __init__(self, **kwargs):
+        super().__init__(max_length=100, **kwargs)
+
+
+def tag_choices():
+    return [('', 'All')] + [(name, name) for pk, name, slug in cache.get_tags()]
+
+
+class TagChoiceField(TagFieldMixin, forms.ChoiceField):
+    """
+    Select of tag names, with choices read from the cached tag list each
+    time the form is rendered.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(choices=tag_choices, **kwargs)
+
+    def validate(self, value):
+        # The name is checked when cleaned to the tag, reading the tag list
+        # once.
+        forms.Field.validate(self, value)
+
+
+class TagInputMixin:
+    """
+    Mixin for search forms with a tag_input filter. With
+    BLOG_TAG_AUTOCOMPLETE set, the tag select (which renders every tag) is
+    replaced by a text input with autocomplete.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        field = self.fields['tag_input']
+        if getattr(settings, 'BLOG_TAG_AUTOCOMPLETE', False):
+            self.fields['tag_input'] = TagNameField(label=field.label,
+                                                    required=False)
+        else:
+            field.widget.attrs.update({'class': 'rounded-0 custom-select'})
+
+
+class SearchPostForm(TagInputMixin, forms.Form):
     """
     Form used to obtain user inputs for searching all posts.
     """
     post_input = forms.CharField(max_length=100, required=False)
 
-    # Set tag choices from database.
-    tag_input = forms.ModelChoiceField(label='Topic',
-                                       queryset=models.Tag.objects.all(),
-                                       empty_label="All",
-                                       to_field_name="name",
-                                       required=False)
+    # Set tag choices from the cached tag list.
+    tag_input = TagChoiceField(label='Topic', required=False)
 
     order_input = forms.ChoiceField(
-        label='Sort', choices=((0, 'New'), (1, 'Old')))
+        label='Sort', choices=((0, 'New'), (1, 'Old'), (2, 'Relevance')))
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -109,25 +193,19 @@ class SearchPostForm(forms.Form):
             'class': 'rounded-0 form-control form-control-md',
             'placeholder': "Search posts"
         })
-        self.fields['tag_input'].widget.attrs.update(
-            {'class': 'rounded-0 custom-select'})
         self.fields['order_input'].widget.attrs.update(
             {'class': 'rounded-0 custom-select'})
 
 
-class SearchDraftForm(forms.Form):
+class SearchDraftForm(TagInputMixin, forms.Form):
     """
     Form used to obtain staff user inputs for searching user drafts.
     """
     post_input = forms.CharField(
         label='Search', max_length=100, required=False)
 
-    # Set tag choices from database.
-    tag_input = forms.ModelChoiceField(label='Topic',
-                                       queryset=models.Tag.objects.all(),
-                                       empty_label="All",
-                                       to_field_name="name",
-                                       required=False)
+    # Set tag choices from the cached tag list.
+    tag_input = TagChoiceField(label='Topic', required=False)
 
     order_input = forms.ChoiceField(
         label='Sort', choices=((0, 'New'), (1, 'Old')))
@@ -140,8 +218,6 @@ class SearchDraftForm(forms.Form):
             'class': 'rounded-0 form-control form-control-md',
             'placeholder': "Search drafts"
         })
-        self.fields['tag_input'].widget.attrs.update(
-            {'class': 'rounded-0 custom-select'})
         self.fields['order_input'].widget.attrs.update(
             {'class': 'rounded-0 custom-select'})
 
@@ -0,0 +1,137 @@
+# Responsive image derivatives.
+#
+# When a post or tag image is uploaded, resized copies are saved next to the
+# original at fixed widths, re-encoded as JPEG (PNG for PNG originals) and
+# WebP, along with a full size WebP. Derivative names are derived from the
+# original name, so templates only need the original width (stored on the
+# model) to build srcset attributes.
+
+import io
+import posixpath
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+# Widths of the resized derivatives, in pixels. Only widths smaller than the
+# original are generated.
+DERIVATIVE_WIDTHS = (320, 640, 1024, 1600)
+
+JPEG_QUALITY = 80
+WEBP_QUALITY = 80
+
+
+def fallback_format(name):
+    """
+    Returns the (Pillow format, extension) of non-WebP derivatives.
+    """
+    if posixpath.splitext(name)[1].lower() == '.png':
+        return 'PNG', 'png'
+    return 'JPEG', 'jpg'
+
+
+def derivative_name(name, width, webp=False):
+    """
+    Returns the storage name of the derivative of image name at width. A
+    width of None gives the full size derivative (WebP only).
+    """
+    stem = posixpath.splitext(name)[0]
+    ext = 'webp' if webp else fallback_format(name)[1]
+    if width is None:
+        return '{0}_full.{1}'.format(stem, ext)
+    return '{0}_{1}w.{2}'.format(stem, width, ext)
+
+
+def derivative_widths(width):
+    """
+    Returns the derivative widths generated for an original of width.
+    """
+    if not width:
+        return []
+    return [w for w in DERIVATIVE_WIDTHS if w < width]
+
+
+def all_derivative_names(name):
+    """
+    Returns the names of every derivative that may exist for image name.
+    """
+    names = [derivative_name(name, None, webp=True)]
+    for width in DERIVATIVE_WIDTHS:
+        names.append(derivative_name(name, width))
+        names.append(derivative_name(name, width, webp=True))
+    return names
+
+
+def encode(image, image_format):
+    """
+    Returns the image encoded in image_format.
+    """
+    output = io.BytesIO()
+    if image_format == 'JPEG':
+        image.convert('RGB').save(output, 'JPEG', quality=JPEG_QUALITY,
+                                  optimize=True, progressive=True)
+    elif image_format == 'WEBP':
+        image.save(output, 'WEBP', quality=WEBP_QUALITY, method=4)
+    else:
+        image.save(output, image_format, optimize=True)
+    return output.getvalue()
+
+
+def save_derivative(storage, name, content):
+    """
+    Saves a derivative, replacing any existing file of the same name (the
+    S3 storage would otherwise save under a new name).
+    """
+    storage.delete(name)
+    storage.save(name, ContentFile(content))
+
+
+def generate_derivatives(field_file):
+    """
+    Saves the resized and WebP derivatives of an image and returns the
+    (width, height) of the original.
+    """
+    storage = field_file.storage
+    with storage.open(field_file.name, 'rb') as f:
+        image = Image.open(f)
+        image.load()
+
+    # Apply the EXIF orientation so derivatives are the right way up.
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    width, height = image.size
+    image_format = fallback_format(field_file.name)[0]
+
+    save_derivative(storage, derivative_name(field_file.name, None, True),
+                    encode(image, 'WEBP'))
+    for target in derivative_widths(width):
+        resized = image.resize(
+            (target, round(height * target / width)), Image.LANCZOS)
+        save_derivative(storage, derivative_name(field_file.name, target),
+                        encode(resized, image_format))
+        save_derivative(storage,
+                        derivative_name(field_file.name, target, True),
+                        encode(resized, 'WEBP'))
+    return width, height
+
+
+def process_image(instance, field_name='image'):
+    """
+    Generates the derivatives of a saved instance's image and stores the
+    image dimensions on the instance.
+    """
+    field_file = getattr(instance, field_name)
+    width, height = generate_derivatives(field_file)
+    dimensions = {'{0}_width'.format(field_name): width,
+                  '{0}_height'.format(field_name): height}
+    for attr, value in dimensions.items():
+        setattr(instance, attr, value)
+    type(instance).objects.filter(pk=instance.pk).update(**dimensions)
+
+
+def delete_derivatives(name, storage):
+    """
+    Deletes every derivative of image name.
+    """
+    for derivative in all_derivative_names(name):
+        storage.delete(derivative)
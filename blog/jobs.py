@@ -0,0 +1,128 @@
+# Background job queue.
+#
+# Slow side effects (image processing, storage deletes, email) are stored as
+# Job rows and run by the run_jobs management command, so requests return
+# once the database write is done. With BLOG_JOBS_INLINE set (tests and
+# development), jobs run immediately instead.
+#
+# Tasks are functions decorated with @task, called with JSON serialisable
+# arguments:
+#
+#     @jobs.task
+#     def delete_image(name):
+#         ...
+#
+#     delete_image.delay('post_pictures/post_1/photo.jpg')
+
+import logging
+import traceback
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Seconds before the first retry of a failed job, doubled on each attempt.
+RETRY_DELAY = 30
+
+
+def task(func):
+    """
+    Decorator registering a function as a task that can be queued with
+    func.delay(*args, **kwargs).
+    """
+    func.is_task = True
+    func.task_name = '{0}.{1}'.format(func.__module__, func.__qualname__)
+    func.delay = lambda *args, **kwargs: enqueue(func, *args, **kwargs)
+    return func
+
+
+def enqueue(func, *args, **kwargs):
+    """
+    Queues a call of the task func, or runs it immediately in inline mode.
+    """
+    if settings.BLOG_JOBS_INLINE:
+        return func(*args, **kwargs)
+    Job = apps.get_model('blog', 'Job')
+    return Job.objects.create(
+        task=func.task_name, args=list(args), kwargs=kwargs)
+
+
+def get_task(name):
+    """
+    Returns the task function with the dotted path name.
+    """
+    func = import_string(name)
+    if not getattr(func, 'is_task', False):
+        raise ImportError('{0} is not a task'.format(name))
+    return func
+
+
+def claim_jobs(limit):
+    """
+    Marks up to limit due jobs as running and returns them. Rows locked by
+    other workers are skipped where the database supports it.
+    """
+    Job = apps.get_model('blog', 'Job')
+    now = timezone.now()
+    with transaction.atomic():
+        queryset = (Job.objects
+                    .filter(status=Job.PENDING, run_at__lte=now)
+                    .order_by('run_at', 'pk'))
+        if transaction.get_connection().features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True)
+        claimed = list(queryset[:limit])
+        Job.objects.filter(pk__in=[job.pk for job in claimed]).update(
+            status=Job.RUNNING, locked_at=now)
+    return claimed
+
+
+def run_job(job):
+    """
+    Runs a claimed job. Successful jobs are deleted; failed jobs are retried
+    with an increasing delay until max_attempts is reached.
+    """
+    Job = type(job)
+    job.attempts += 1
+    try:
+        get_task(job.task)(*job.args, **job.kwargs)
+    except Exception:
+        logger.exception('Job %s (%s) failed', job.pk, job.task)
+        job.last_error = traceback.format_exc()
+        job.locked_at = None
+        if job.attempts < job.max_attempts:
+            job.status = Job.PENDING
+            job.run_at = timezone.now() + timedelta(
+                seconds=RETRY_DELAY * 2 ** (job.attempts - 1))
+        else:
+            job.status = Job.FAILED
+        job.save()
+        return False
+    job.delete()
+    return True
+
+
+def release_stale_jobs(seconds):
+    """
+    Returns jobs left running for longer than seconds (e.g. by a worker that
+    was stopped) to the queue.
+    """
+    Job = apps.get_model('blog', 'Job')
+    return Job.objects.filter(
+        status=Job.RUNNING,
+        locked_at__lt=timezone.now() - timedelta(seconds=seconds),
+    ).update(status=Job.PENDING, locked_at=None)
+
+
+def run_pending(limit=10):
+    """
+    Claims and runs up to limit due jobs. Returns the number run.
+    """
+    jobs = claim_jobs(limit)
+    for job in jobs:
+        run_job(job)
+    return len(jobs)
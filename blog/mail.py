@@ -0,0 +1,87 @@
+# Email backend queuing messages as background jobs, so sending the app's
+# mail and broken link reports (from BrokenLinkEmailsMiddleware) does not
+# hold up responses. Admin error reports are sent directly (see
+# AdminEmailHandler), as the database holding the job queue may be the cause
+# of the error.
+
+from django.conf import settings
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import DatabaseError
+from django.utils import log
+from django.utils.module_loading import import_string
+
+
+def serialize_message(message):
+    """
+    Returns the fields of an email message as a JSON serialisable dict.
+    """
+    return {
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': message.to,
+        'cc': message.cc,
+        'bcc': message.bcc,
+        'reply_to': message.reply_to,
+        'headers': message.extra_headers,
+        'alternatives': [list(alternative) for alternative in
+                         getattr(message, 'alternatives', [])],
+    }
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """
+    Email backend queuing messages to be sent with BLOG_EMAIL_BACKEND by the
+    job worker. Messages with attachments, and messages that could not be
+    queued, are sent immediately.
+    """
+
+    def send_now(self, message):
+        connection = mail.get_connection(settings.BLOG_EMAIL_BACKEND,
+                                         fail_silently=self.fail_silently)
+        return connection.send_messages([message]) or 0
+
+    def send_messages(self, email_messages):
+        # Imported when sending, as this module is loaded by the logging
+        # configuration before the app's models are.
+        from . import tasks
+
+        count = 0
+        for message in email_messages:
+            try:
+                if message.attachments:
+                    count += self.send_now(message)
+                    continue
+                try:
+                    tasks.send_email.delay(serialize_message(message))
+                except DatabaseError:
+                    count += self.send_now(message)
+                    continue
+            except Exception:
+                if not self.fail_silently:
+                    raise
+            else:
+                count += 1
+        return count
+
+
+def direct_backend():
+    """
+    Returns the email backend sending messages without queuing them.
+    """
+    backend = settings.EMAIL_BACKEND
+    if issubclass(import_string(backend), QueuedEmailBackend):
+        return settings.BLOG_EMAIL_BACKEND
+    return backend
+
+
+class AdminEmailHandler(log.AdminEmailHandler):
+    """
+    Logging handler sending error reports to ADMINS directly rather than
+    through the job queue.
+    """
+
+    def connection(self):
+        return mail.get_connection(self.email_backend or direct_backend(),
+                                   fail_silently=True)
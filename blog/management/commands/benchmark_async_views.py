@@ -0,0 +1,119 @@
+import asyncio
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+
+from blog import async_views, models, views
+
+
+def summarise(timings, elapsed):
+    """
+    Returns latency percentiles (ms) and throughput for a run.
+    """
+    cuts = statistics.quantiles(timings, n=100)
+    return {
+        'p50_ms': round(cuts[49], 3),
+        'p99_ms': round(cuts[98], 3),
+        'mean_ms': round(statistics.mean(timings), 3),
+        'requests_per_second': round(len(timings) / elapsed, 1),
+    }
+
+
+class Command(BaseCommand):
+    """
+    Benchmarks the landing and post detail pages under concurrency,
+    comparing the sync views run by a WSGI thread pool with the async views
+    run on one event loop, as under ASGI.
+    """
+    help = ('Benchmarks the sync (WSGI) and async (ASGI) landing and post '
+            'detail views against the configured database and prints the '
+            'latencies as JSON. The page cache is disabled while running.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Number of requests per page and mode '
+                                 '(default 200).')
+        parser.add_argument('--concurrency', type=int, default=10,
+                            help='Number of concurrent requests (default '
+                                 '10).')
+        parser.add_argument('--post', type=int,
+                            help='Pk of the post requested (default the most '
+                                 'recent published post).')
+
+    def handle(self, *args, **options):
+        pk = options['post'] or (models.Post.objects
+                                 .filter(publish_date__isnull=False)
+                                 .order_by('-publish_date')
+                                 .values_list('pk', flat=True).first())
+        if pk is None:
+            raise CommandError('There are no published posts to request.')
+        if options['requests'] < 2:
+            raise CommandError('At least 2 requests are needed.')
+
+        pages = {
+            'landing': (reverse('blog:landing'), {},
+                        views.LandingPage.as_view(), async_views.landing),
+            'post_detail': (reverse('blog:post-detail', kwargs={'pk': pk}),
+                            {'pk': pk}, views.PostDetailView.as_view(),
+                            async_views.post_detail),
+        }
+        results = {}
+        with override_settings(BLOG_PAGE_CACHE_TIMEOUT=0):
+            for name, (url, kwargs, sync_view, async_view) in pages.items():
+                results[name] = {
+                    'wsgi': self.run_sync(sync_view, url, kwargs, options),
+                    'asgi': asyncio.run(
+                        self.run_async(async_view, url, kwargs, options)),
+                }
+
+        self.stdout.write(json.dumps({
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'results': results,
+        }, indent=2))
+
+    def make_request(self, url):
+        request = RequestFactory().get(url)
+        request.user = AnonymousUser()
+        return request
+
+    def run_sync(self, view, url, kwargs, options):
+        """
+        Requests the sync view from a pool of threads, closing connections
+        after each request as the WSGI handler does.
+        """
+        def request_page():
+            start = time.perf_counter()
+            view(self.make_request(url), **kwargs).render()
+            close_old_connections()
+            return (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(options['concurrency']) as executor:
+            timings = list(executor.map(
+                lambda i: request_page(), range(options['requests'])))
+        return summarise(timings, time.perf_counter() - start)
+
+    async def run_async(self, view, url, kwargs, options):
+        """
+        Requests the async view concurrently on the event loop.
+        """
+        semaphore = asyncio.Semaphore(options['concurrency'])
+
+        async def request_page():
+            async with semaphore:
+                start = time.perf_counter()
+                await view(self.make_request(url), **kwargs)
+                return (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        timings = await asyncio.gather(
+            *(request_page() for i in range(options['requests'])))
+        return summarise(timings, time.perf_counter() - start)
@@ -0,0 +1,76 @@
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand
+
+from blog import storage as blog_storage
+
+
+def legacy_relocation(storage, tmp_name, new_name):
+    """
+    The previous Post.save relocation: download the image and save it again
+    under the new name, then delete the original.
+    """
+    with storage.open(tmp_name, 'rb') as f:
+        new_name = storage.save(new_name, File(f))
+    storage.delete(tmp_name)
+    return new_name
+
+
+class Command(BaseCommand):
+    """
+    Benchmarks moving a post image out of the tmp directory, comparing the
+    storage-level move with the previous download and re-upload.
+    """
+    help = ('Benchmarks post image relocation using a local filesystem '
+            'storage and prints the timings as JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=float, default=5,
+                            help='Image size in MB (default 5).')
+        parser.add_argument('--runs', type=int, default=20,
+                            help='Number of runs per method (default 20).')
+
+    def handle(self, *args, **options):
+        payload = os.urandom(int(options['size'] * 1024 * 1024))
+        location = tempfile.mkdtemp()
+        storage = FileSystemStorage(location=location)
+        methods = {
+            'legacy_copy': legacy_relocation,
+            'storage_move': blog_storage.move_file,
+        }
+        results = {}
+        try:
+            for label, relocate in methods.items():
+                timings = []
+                for run in range(options['runs']):
+                    tmp_name = storage.save(
+                        'post_pictures/tmp/image.jpg', ContentFile(payload))
+                    start = time.perf_counter()
+                    new_name = relocate(
+                        storage, tmp_name,
+                        'post_pictures/post_{0}/image.jpg'.format(run))
+                    timings.append((time.perf_counter() - start) * 1000)
+                    storage.delete(new_name)
+                results[label] = {
+                    'mean_ms': round(statistics.mean(timings), 3),
+                    'median_ms': round(statistics.median(timings), 3),
+                    'max_ms': round(max(timings), 3),
+                }
+        finally:
+            shutil.rmtree(location)
+
+        # The legacy path also made a second full model save per new post;
+        # the move updates only the image column.
+        self.stdout.write(json.dumps({
+            'size_mb': options['size'],
+            'runs': options['runs'],
+            'results': results,
+        }, indent=2))
@@ -0,0 +1,147 @@
+import json
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from blog import models, urls, warmup
+
+# Views changing data on GET requests, which are not benchmarked.
+SKIPPED = ('logout', 'post_publish')
+
+
+def percentile(cuts, value):
+    return round(cuts[value - 1], 3)
+
+
+class Command(BaseCommand):
+    """
+    Benchmarks every blog URL through the test client, reporting latency
+    percentiles and query counts as JSON that can be diffed between runs.
+    """
+    help = ('Requests each URL in blog/urls.py (as an anonymous user, and as '
+            'a staff user if given) against the configured database, and '
+            'prints latency percentiles and query counts per URL as JSON. '
+            'Run seed_blog first for a realistic amount of content.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50,
+                            help='Number of timed requests per URL (default '
+                                 '50).')
+        parser.add_argument('--warmup', type=int, default=2,
+                            help='Number of untimed requests per URL first '
+                                 '(default 2).')
+        parser.add_argument('--staff',
+                            help='Username of a staff user to also request '
+                                 'each URL as.')
+        parser.add_argument('--page-cache', action='store_true',
+                            help='Keep the anonymous page cache enabled.')
+        parser.add_argument('--output',
+                            help='File to write the JSON to (default '
+                                 'standard output).')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 2:
+            raise CommandError('At least 2 requests are needed.')
+        clients = {'anonymous': Client(HTTP_HOST=warmup.get_host())}
+        username = None
+        if options['staff']:
+            user = get_user_model().objects.filter(
+                username=options['staff'], is_staff=True).first()
+            if user is None:
+                raise CommandError('No staff user {0}.'.format(
+                    options['staff']))
+            clients['staff'] = Client(HTTP_HOST=warmup.get_host())
+            clients['staff'].force_login(user)
+            username = user.username
+
+        params = self.get_params(username)
+        overrides = {} if options['page_cache'] else {
+            'BLOG_PAGE_CACHE_TIMEOUT': 0}
+        results = {}
+        with override_settings(**overrides):
+            for pattern in urls.urlpatterns:
+                if pattern.name in SKIPPED:
+                    continue
+                kwargs = self.get_kwargs(pattern, params)
+                if kwargs is None:
+                    continue
+                name = '{0}:{1}'.format(urls.app_name, pattern.name)
+                url = reverse(name, kwargs=kwargs)
+                results[name] = {label: self.run(client, url, options)
+                                 for label, client in clients.items()}
+
+        output = json.dumps({
+            'requests': options['requests'],
+            'page_cache': options['page_cache'],
+            'results': results,
+        }, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+    def get_params(self, username):
+        """
+        Returns the URL parameters requested: the most recent published
+        post, the tag with most posts, the latest comment and the staff
+        user.
+        """
+        return {
+            'pk': (models.Post.objects
+                   .filter(publish_date__isnull=False)
+                   .order_by('-publish_date')
+                   .values_list('pk', flat=True).first()),
+            'slug': (models.Tag.objects.order_by('-num_posts')
+                     .values_list('slug', flat=True).first()),
+            'comment': (models.Comment.objects.order_by('-created_date')
+                        .values_list('pk', flat=True).first()),
+            'username': username,
+        }
+
+    def get_kwargs(self, pattern, params):
+        """
+        Returns the URL kwargs of pattern, or None if there is nothing to
+        request (e.g. no comments, or drafts without a staff user).
+        """
+        kwargs = {}
+        for key in pattern.pattern.converters:
+            param = key
+            if key == 'pk' and pattern.name.startswith('comment-'):
+                param = 'comment'
+            if params[param] is None:
+                return None
+            kwargs[key] = params[param]
+        return kwargs
+
+    def run(self, client, url, options):
+        """
+        Requests url, returning its status code, latency percentiles (ms)
+        and median query count.
+        """
+        timings, queries = [], []
+        for i in range(options['warmup'] + options['requests']):
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                response = client.get(url, secure=True)
+                elapsed = (time.perf_counter() - start) * 1000
+            if i >= options['warmup']:
+                timings.append(elapsed)
+                queries.append(len(context.captured_queries))
+
+        cuts = statistics.quantiles(timings, n=100)
+        return {
+            'url': url,
+            'status': response.status_code,
+            'p50_ms': percentile(cuts, 50),
+            'p90_ms': percentile(cuts, 90),
+            'p99_ms': percentile(cuts, 99),
+            'mean_ms': round(statistics.mean(timings), 3),
+            'queries': statistics.median_low(queries),
+        }
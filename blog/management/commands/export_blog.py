@@ -0,0 +1,53 @@
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog import archive
+
+
+class Command(BaseCommand):
+    """
+    Exports tags, posts and comments as an NDJSON archive.
+    """
+    help = ('Exports tags, posts and comments as an NDJSON archive (one '
+            'record per line). Images are referenced by storage path.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output', nargs='?', default='-',
+            help='Archive file to write, or - for standard output.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Number of rows read from the database at a time.')
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Continue an interrupted export after the last complete '
+                 'record in the output file.')
+
+    def handle(self, *args, **options):
+        output = options['output']
+        start = None
+        if options['resume']:
+            if output == '-':
+                raise CommandError('--resume requires an output file.')
+            if os.path.exists(output):
+                start = archive.last_record(output)
+
+        if output == '-':
+            f = sys.stdout
+        else:
+            f = open(output, 'a' if start else 'w', encoding='utf-8')
+        count = 0
+        try:
+            for line in archive.export_records(
+                    start, chunk_size=options['chunk_size']):
+                f.write(line)
+                count += 1
+        finally:
+            if f is not sys.stdout:
+                f.close()
+
+        if output != '-':
+            self.stdout.write(self.style.SUCCESS(
+                'Exported {0} records to {1}'.format(count, output)))
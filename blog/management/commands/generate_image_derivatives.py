@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from blog import images, models
+
+
+class Command(BaseCommand):
+    """
+    Generates resized derivatives for post and tag images.
+    """
+    help = ('Generates resized derivatives for post and tag images that do '
+            'not have them yet.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Regenerate derivatives for every image.')
+
+    def handle(self, *args, **options):
+        for model in (models.Post, models.Tag):
+            queryset = model.objects.exclude(image='').exclude(image=None)
+            if not options['all']:
+                queryset = queryset.filter(image_width=None)
+            count = 0
+            for instance in queryset.only('pk', 'image').iterator():
+                images.process_image(instance)
+                count += 1
+            self.stdout.write(self.style.SUCCESS(
+                'Generated derivatives for {0} {1} images'.format(
+                    count, model._meta.verbose_name)))
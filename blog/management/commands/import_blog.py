@@ -0,0 +1,44 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog import archive
+
+
+class Command(BaseCommand):
+    """
+    Imports an NDJSON archive written by export_blog.
+    """
+    help = ('Imports tags, posts and comments from an NDJSON archive written '
+            'by export_blog, keeping their pks. Records that already exist '
+            'are skipped, so an interrupted import can be run again to '
+            'resume. Image files are not copied; run '
+            'generate_image_derivatives if the images are new to the '
+            'storage.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'input', nargs='?', default='-',
+            help='Archive file to read, or - for standard input.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Number of records created at a time.')
+
+    def handle(self, *args, **options):
+        importer = archive.Importer(chunk_size=options['chunk_size'])
+        if options['input'] == '-':
+            f = sys.stdin
+        else:
+            f = open(options['input'], encoding='utf-8')
+        try:
+            importer.run(archive.read_records(f))
+        except ValueError as e:
+            raise CommandError('Invalid archive: {0}'.format(e))
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+        for label in archive.LABELS:
+            self.stdout.write(self.style.SUCCESS(
+                '{0}: {1} imported, {2} already present'.format(
+                    label, importer.created[label], importer.skipped[label])))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from blog import models
+
+
+class Command(BaseCommand):
+    """
+    Recalculates the stored number of published posts for every tag.
+    """
+    help = 'Recalculates the stored number of published posts for every tag.'
+
+    def handle(self, *args, **options):
+        updated = models.Tag.objects.all().update_num_posts()
+        self.stdout.write(self.style.SUCCESS(
+            'Updated post counts for {0} tags'.format(updated)))
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from blog import jobs
+
+
+class Command(BaseCommand):
+    """
+    Worker running queued background jobs.
+    """
+    help = 'Runs queued background jobs until stopped.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit once there are no due jobs left.')
+        parser.add_argument(
+            '--batch-size', type=int, default=10,
+            help='Number of jobs claimed at a time.')
+        parser.add_argument(
+            '--sleep', type=float, default=2,
+            help='Seconds to wait when there are no due jobs.')
+        parser.add_argument(
+            '--stale-after', type=int, default=600,
+            help='Seconds after which running jobs are returned to the '
+                 'queue, in case their worker was stopped.')
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            close_old_connections()
+            jobs.release_stale_jobs(options['stale_after'])
+            count = jobs.run_pending(options['batch_size'])
+            total += count
+            if not count:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS(
+            'Ran {0} jobs'.format(total)))
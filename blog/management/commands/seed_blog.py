@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from blog import archive, seed
+
+
+class Command(BaseCommand):
+    """
+    Generates synthetic blog content for benchmarks.
+    """
+    help = ('Creates users, tags, published and draft posts with CKEditor '
+            'style bodies, post tags and comments, in chunks. The same seed '
+            'generates the same content.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tags', type=int, default=20,
+                            help='Number of tags (default 20).')
+        parser.add_argument('--posts', type=int, default=200,
+                            help='Number of posts (default 200).')
+        parser.add_argument('--comments', type=int, default=2000,
+                            help='Number of comments (default 2000).')
+        parser.add_argument('--users', type=int, default=20,
+                            help='Number of post and comment authors '
+                                 '(default 20).')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Random seed (default 0).')
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Number of records created at a time.')
+
+    def handle(self, *args, **options):
+        importer = archive.Importer(chunk_size=options['chunk_size'])
+        importer.run(seed.generate_records(
+            num_tags=options['tags'], num_posts=options['posts'],
+            num_comments=options['comments'], num_users=options['users'],
+            seed=options['seed']))
+
+        for label in archive.LABELS:
+            self.stdout.write(self.style.SUCCESS('{0}: {1} created'.format(
+                label, importer.created[label])))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from blog import warmup
+
+
+class Command(BaseCommand):
+    """
+    Warms the template and page caches after a deploy.
+    """
+    help = ('Compiles templates and renders the landing page, the top tags '
+            'and the most recent posts, filling the caches.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--posts', type=int, default=warmup.WARM_POSTS,
+            help='Number of the most recent posts rendered.')
+        parser.add_argument(
+            '--tags', type=int, default=warmup.WARM_TAGS,
+            help='Number of the tags with most posts rendered.')
+        parser.add_argument(
+            '--timeout', type=float, default=warmup.WARM_TIMEOUT,
+            help='Seconds spent rendering pages at most (0 for no limit).')
+
+    def handle(self, *args, **options):
+        count = warmup.compile_templates()
+        self.stdout.write('Compiled {0} templates'.format(count))
+
+        failed = 0
+        for url, status, seconds in warmup.warm_pages(
+                options['posts'], options['tags'], options['timeout']):
+            if status != 200:
+                failed += 1
+            self.stdout.write('{0} {1} {2:.0f}ms'.format(
+                status, url, seconds * 1000))
+        style = self.style.WARNING if failed else self.style.SUCCESS
+        self.stdout.write(style('Warmed caches ({0} pages failed)'.format(
+            failed)))
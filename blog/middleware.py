@@ -0,0 +1,212 @@
+# Blog middleware.
+
+import logging
+import re
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+metrics = logging.getLogger('blog.metrics')
+
+# Tags whose content is whitespace sensitive, left as rendered.
+PRESERVED_HTML = re.compile(
+    r'(<(pre|textarea|script|style)\b.*?</\2\s*>)', re.IGNORECASE | re.DOTALL)
+LINE_INDENT = re.compile(r'^[ \t]+', re.MULTILINE)
+BLANK_LINES = re.compile(r'\n\s*\n')
+
+
+def minify_html(content):
+    """
+    Strips template-induced whitespace (indentation and blank lines) from
+    HTML, outside of whitespace sensitive tags. Rendered pages are
+    unchanged, as browsers collapse the removed whitespace.
+    """
+    parts = PRESERVED_HTML.split(content)
+    # split() returns text, then each match and its tag name group.
+    for i in range(0, len(parts), 3):
+        parts[i] = BLANK_LINES.sub('\n', LINE_INDENT.sub('', parts[i]))
+    return ''.join(part for i, part in enumerate(parts) if i % 3 != 2)
+
+
+def accepted_encodings(request):
+    """
+    Returns the content codings the request's Accept-Encoding header
+    accepts (with a non-zero quality value).
+    """
+    accepted = set()
+    for coding in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        name, _, params = coding.strip().lower().partition(';')
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if name.strip():
+            accepted.add(name.strip())
+    return accepted
+
+
+class GzipCompressor:
+    encoding = 'gzip'
+
+    def __init__(self):
+        # wbits 31 writes a gzip header and trailer.
+        self.compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+
+    def process(self, data):
+        return self.compressor.compress(data)
+
+    def flush(self):
+        return self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self.compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliCompressor:
+    encoding = 'br'
+
+    def __init__(self):
+        # Quality 5 compresses better than gzip at a similar speed; higher
+        # qualities are too slow to use per response.
+        self.compressor = brotli.Compressor(quality=5)
+
+    def process(self, data):
+        return self.compressor.process(data)
+
+    def flush(self):
+        return self.compressor.flush()
+
+    def finish(self):
+        return self.compressor.finish()
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses with brotli (if the brotli package is installed)
+    or gzip, as accepted by the client, and strips template whitespace from
+    HTML responses when BLOG_MINIFY_HTML is set. Streaming responses are
+    compressed chunk by chunk.
+
+    Responses that include the CSRF token (forms shown to logged in users)
+    are not compressed, as compressing a secret alongside content reflected
+    from the request exposes it to BREACH attacks. Anonymous pages, which
+    have no forms, are compressed.
+
+    Response sizes before and after compression are logged to the
+    blog.metrics logger.
+    """
+    # Responses shorter than this are not worth compressing.
+    min_length = 200
+    compressible_types = ('text/', 'application/json', 'application/xml',
+                          'application/rss+xml', 'application/atom+xml',
+                          'application/javascript', 'image/svg+xml')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        content_type = response.get('Content-Type', '').lower()
+        if (getattr(settings, 'BLOG_MINIFY_HTML', False)
+                and not response.streaming
+                and content_type.startswith('text/html')
+                and not response.has_header('Content-Encoding')):
+            response.content = minify_html(
+                response.content.decode(response.charset)
+            ).encode(response.charset)
+            # CommonMiddleware has already set the length of the full body.
+            if response.has_header('Content-Length'):
+                response['Content-Length'] = str(len(response.content))
+
+        if not content_type.startswith(self.compressible_types):
+            return response
+        # Vary even if this response is not compressed, so caches do not
+        # serve it to clients that accept compression.
+        patch_vary_headers(response, ('Accept-Encoding',))
+        compressor = self.get_compressor(request, response)
+        if compressor is None:
+            self.record(request, response, None)
+            return response
+
+        if response.streaming:
+            response.streaming_content = self.compress_stream(
+                request, compressor, response.streaming_content)
+            del response['Content-Length']
+        else:
+            content = response.content
+            compressed = compressor.process(content) + compressor.finish()
+            if len(compressed) >= len(content):
+                self.record(request, response, None)
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+            self.record(request, response, compressor.encoding,
+                        len(content), len(compressed))
+
+        # The compressed body differs from the one the view's strong ETag
+        # was computed for.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = compressor.encoding
+        return response
+
+    def get_compressor(self, request, response):
+        """
+        Returns a compressor for the response, or None if it should not be
+        compressed.
+        """
+        if response.has_header('Content-Encoding'):
+            return None
+        if request.META.get('CSRF_COOKIE_USED'):
+            return None
+        if not response.streaming and len(response.content) < self.min_length:
+            return None
+        accepted = accepted_encodings(request)
+        if brotli is not None and 'br' in accepted:
+            return BrotliCompressor()
+        if 'gzip' in accepted:
+            return GzipCompressor()
+        return None
+
+    def compress_stream(self, request, compressor, chunks):
+        """
+        Yields the compressed chunks, flushed after each chunk so clients
+        receive content as it is streamed.
+        """
+        size = compressed_size = 0
+        for chunk in chunks:
+            size += len(chunk)
+            data = compressor.process(chunk) + compressor.flush()
+            compressed_size += len(data)
+            if data:
+                yield data
+        data = compressor.finish()
+        compressed_size += len(data)
+        yield data
+        metrics.info(
+            'response_size path=%s encoding=%s size=%d compressed_size=%d',
+            request.path, compressor.encoding, size, compressed_size)
+
+    def record(self, request, response, encoding, size=None,
+               compressed_size=None):
+        """
+        Logs the response size (unknown for uncompressed streams).
+        """
+        if response.streaming:
+            return
+        if size is None:
+            size = compressed_size = len(response.content)
+        metrics.info(
+            'response_size path=%s encoding=%s size=%d compressed_size=%d',
+            request.path, encoding or 'identity', size, compressed_size)
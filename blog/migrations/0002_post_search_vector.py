@@ -0,0 +1,48 @@
+# Generated by Django 3.1.2 on 2026-10-17 03:20
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+from blog import search
+
+
+def create_search_index(apps, schema_editor):
+    """
+    Creates the GIN index and populates the search vector of existing posts.
+    Only runs on PostgreSQL; other databases use the fallback search.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS blog_post_search_vector_gin '
+        'ON blog_post USING gin (search_vector)')
+    Post = apps.get_model('blog', 'Post')
+    posts = Post.objects.using(schema_editor.connection.alias)
+    for post in posts.only('title', 'subheading', 'text'):
+        posts.filter(pk=post.pk).update(
+            search_vector=search.build_search_vector(post))
+
+
+def drop_search_index(apps, schema_editor):
+    """
+    Drops the GIN index created by create_search_index.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS blog_post_search_vector_gin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 3.1.2 on 2026-10-17 03:20
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_num_posts(apps, schema_editor):
+    """
+    Sets the number of published posts for existing tags.
+    """
+    Tag = apps.get_model('blog', 'Tag')
+    Post = apps.get_model('blog', 'Post')
+    published = (Post.tags.through.objects
+                 .filter(tag=OuterRef('pk'), post__publish_date__isnull=False)
+                 .order_by()
+                 .values('tag')
+                 .annotate(count=Count('post'))
+                 .values('count'))
+    Tag.objects.using(schema_editor.connection.alias).update(
+        num_posts=Coalesce(Subquery(published), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_post_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tag',
+            name='num_posts',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(populate_num_posts, migrations.RunPython.noop),
+    ]
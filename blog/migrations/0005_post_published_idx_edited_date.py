@@ -0,0 +1,21 @@
+# Generated by Django 3.1.2 on 2026-10-17 03:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='post',
+            name='post_published_idx',
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(publish_date__isnull=False), fields=['-publish_date', '-id', 'edited_date'], name='post_published_idx'),
+        ),
+    ]
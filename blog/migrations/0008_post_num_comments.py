@@ -0,0 +1,37 @@
+# Generated by Django 3.1.2 on 2026-10-17 03:34
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_num_comments(apps, schema_editor):
+    """
+    Sets the number of comments for existing posts.
+    """
+    Post = apps.get_model('blog', 'Post')
+    Comment = apps.get_model('blog', 'Comment')
+    comments = (Comment.objects
+                .filter(post=OuterRef('pk'))
+                .order_by()
+                .values('post')
+                .annotate(count=Count('pk'))
+                .values('count'))
+    Post.objects.using(schema_editor.connection.alias).update(
+        num_comments=Coalesce(Subquery(comments), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='num_comments',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_num_comments, migrations.RunPython.noop),
+    ]
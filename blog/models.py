@@ -1,29 +1,37 @@
-# django-cleanup app is used to delete images whenever the image field
-# is changed.
+# django-cleanup app is used to delete files whenever a file field is
+# changed. Post and tag images are ignored by it, and are instead deleted
+# (with their derivatives) by background jobs queued from signals.py.
 
 import posixpath
-import urllib
+from contextlib import contextmanager
 
 from ckeditor.fields import RichTextField
-from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth import get_user_model
-from django.core.files import File
-from django.core.files.storage import default_storage
 from django.db import models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.text import slugify
+from django_cleanup import cleanup
+
+from . import search, storage, tasks
 
 # Set user as the currently active user model.
 User = get_user_model()
 
 
+# Directory for images of posts not yet assigned a pk.
+TMP_POST_PHOTO_DIR = 'post_pictures/tmp'
+
+
 def post_photo_path(instance, filename):
     """
     Returns upload path depending on if the post has been assigned a pk.
     """
     if instance.pk is None:
-        return 'post_pictures/tmp/{0}'.format(filename)
+        return '{0}/{1}'.format(TMP_POST_PHOTO_DIR, filename)
     return 'post_pictures/post_{0}/{1}'.format(instance.pk, filename)
 
 
@@ -34,6 +42,70 @@ def tag_photo_path(instance, filename):
     return 'tag_pictures/{0}/{1}'.format(instance.slug, filename)
 
 
+# Pks of posts being deleted. Their comments are deleted with them, and the
+# comment signal receivers skip the work done once for the post (see
+# signals.py).
+deleting_post_pks = set()
+
+
+@contextmanager
+def deleting_posts(pks):
+    """
+    Marks the posts with pks as being deleted within the block.
+    """
+    pks = set(pks)
+    deleting_post_pks.update(pks)
+    try:
+        yield
+    finally:
+        deleting_post_pks.difference_update(pks)
+
+
+class TagQuerySet(models.QuerySet):
+    """
+    Queryset for tags.
+    """
+
+    def update_num_posts(self):
+        """
+        Recalculates the stored number of published posts for each tag.
+        """
+        published = (Post.tags.through.objects
+                     .filter(tag=OuterRef('pk'),
+                             post__publish_date__isnull=False)
+                     .order_by()
+                     .values('tag')
+                     .annotate(count=Count('post'))
+                     .values('count'))
+        return self.update(num_posts=Coalesce(Subquery(published), 0))
+
+
+class PostQuerySet(models.QuerySet):
+    """
+    Queryset for posts.
+    """
+
+    def update_num_comments(self):
+        """
+        Recalculates the stored number of comments for each post.
+        """
+        comments = (Comment.objects
+                    .filter(post=OuterRef('pk'))
+                    .order_by()
+                    .values('post')
+                    .annotate(count=Count('pk'))
+                    .values('count'))
+        return self.update(num_comments=Coalesce(Subquery(comments), 0))
+
+    def delete(self):
+        """
+        Additional to base, marks the posts as being deleted.
+        """
+        with deleting_posts(self.values_list('pk', flat=True)):
+            return super().delete()
+
+
+@cleanup.ignore
 class Tag(models.Model):
     """
     Model for topic tags.
@@ -44,16 +116,37 @@ class Tag(models.Model):
     subheading = models.TextField()
     # Callable upload path.
     image = models.ImageField(blank=True, upload_to=tag_photo_path)
+    # Image dimensions, set when the image derivatives are generated.
+    image_width = models.PositiveIntegerField(
+        blank=True, null=True, editable=False)
+    image_height = models.PositiveIntegerField(
+        blank=True, null=True, editable=False)
     # WYSIWYG rich text editor field (CKEditor).
     overview = RichTextField()
+    # Number of published posts, kept current by signals (see signals.py).
+    # Stored so tags can be sorted by an index rather than an aggregate.
+    num_posts = models.PositiveIntegerField(
+        default=0, db_index=True, editable=False)
+
+    objects = TagQuerySet.as_manager()
 
     def save(self, *args, **kwargs):
         """
-        Additonal to base, sets slug upon save.
+        Additonal to base, sets slug upon save and queues generating the
+        resized derivatives of a newly uploaded image.
         """
         self.slug = slugify(self.name)
+
+        # A newly uploaded image is committed to storage on save.
+        new_image = bool(self.image) and not self.image._committed
+        if not self.image:
+            self.image_width = self.image_height = None
+
         super().save(*args, **kwargs)
 
+        if new_image:
+            tasks.process_tag_image.delay(self.pk, self.image.name)
+
     def get_absolute_url(self):
         return reverse('blog:tag-overview', kwargs={'slug': self.slug})
 
@@ -64,6 +157,7 @@ class Tag(models.Model):
         return self.name
 
 
+@cleanup.ignore
 class Post(models.Model):
     """
     Model for posts.
@@ -74,50 +168,92 @@ class Post(models.Model):
     subheading = models.TextField(blank=True, null=True)
     # Callable upload path.
     image = models.ImageField(blank=True, null=True, upload_to=post_photo_path)
+    # Image dimensions, set when the image derivatives are generated.
+    image_width = models.PositiveIntegerField(
+        blank=True, null=True, editable=False)
+    image_height = models.PositiveIntegerField(
+        blank=True, null=True, editable=False)
     created_date = models.DateTimeField(default=timezone.now, editable=False)
     publish_date = models.DateTimeField(blank=True, null=True)
     edited_date = models.DateTimeField(blank=True, null=True)
     # WYSIWYG rich text editor field (CKEditor).
     text = RichTextField(blank=True, null=True)
+    # Full-text search vector, maintained on save (see search.py). The GIN
+    # index is created by migration on PostgreSQL only.
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Number of comments, kept current by signals (see signals.py).
+    num_comments = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        """
+        Indexes for the published post listings (newest first) and each
+        author's drafts. The primary key is included for cursor pagination,
+        and the edited date so conditional GET validators can be read from
+        the index alone.
+        """
+        indexes = [
+            models.Index(fields=['-publish_date', '-id', 'edited_date'],
+                         condition=models.Q(publish_date__isnull=False),
+                         name='post_published_idx'),
+            models.Index(fields=['author', '-created_date', '-id'],
+                         condition=models.Q(publish_date__isnull=True),
+                         name='post_draft_author_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         """
-        Additonal to base, saves the image in a dir that includes the post pk.
+        Additonal to base, queues moving a newly uploaded image to a dir that
+        includes the post pk and generating its resized derivatives, and
+        updates the search vector if the searched text changed.
         """
+        created = self._state.adding
+
+        # A newly uploaded image is committed to storage on save.
+        new_image = bool(self.image) and not self.image._committed
+        if not self.image:
+            self.image_width = self.image_height = None
 
         # In order to save the image in a directory named with the post pk,
         # the post must first be assigned a pk from the database (i.e. saved).
         # Therefore, when a post is first saved, the image is intially saved
-        # in a tmp directory. It is then moved to a directory named with the
-        # newly assigned post pk.
+        # in a tmp directory. It is then moved by a background job (see
+        # tasks.py) to a directory named with the newly assigned post pk.
 
         # This action saves the record to the database which assigns a pk.
         # If the post has not been saved before, if the user has input an image
         # into the form, the image is saved to a tmp directory.
         super().save(*args, **kwargs)
 
-        # If an image exists, check to see if the image is located in a tmp
-        # directory. If yes, create a new directory using the post pk, move the
-        # image, and remove the tmp directory.
-        if (self.image and
-                urllib.parse.urljoin(settings.MEDIA_URL, 'post_pictures/tmp')
-                == posixpath.dirname(self.image.url)):
-
-            # Store the tmp file path.
-            tmp_file = self.image.name
+        if new_image:
+            tasks.process_post_image.delay(self.pk, self.image.name)
 
-            # Store the image filename.
-            filename = posixpath.basename(tmp_file)
+        # Keep the full-text search vector current with the saved text.
+        search.update_search_vector(
+            self, created, kwargs.get('update_fields'))
 
-            # Open the image located in the tmp directory and call save on the
-            # image field with the image data. As the post object now has a pk,
-            # post_photo_path will return a path including the pk.
-            with default_storage.open(tmp_file, 'rb') as f:
-                data = File(f)
-                self.image.save(filename, data, True)
+    def delete(self, *args, **kwargs):
+        """
+        Additional to base, marks the post as being deleted.
+        """
+        with deleting_posts([self.pk]):
+            return super().delete(*args, **kwargs)
 
-            # Remove the tmp folder.
-            default_storage.delete(tmp_file)
+    def move_image_from_tmp(self):
+        """
+        Moves the image, if located in the tmp directory, to a directory
+        named with the post pk. The move is done by the storage (a copy on
+        S3) without downloading the image, and only the image name is
+        updated in the database.
+        """
+        if (self.image and
+                posixpath.dirname(self.image.name) == TMP_POST_PHOTO_DIR):
+            filename = posixpath.basename(self.image.name)
+            self.image.name = storage.move_file(
+                self.image.storage, self.image.name,
+                post_photo_path(self, filename))
+            type(self).objects.filter(pk=self.pk).update(image=self.image.name)
 
     def publish(self):
         """
@@ -147,6 +283,15 @@ class Comment(models.Model):
     edited_date = models.DateTimeField(blank=True, null=True)
     text = models.TextField()
 
+    class Meta:
+        """
+        Index for a post's comments, newest first.
+        """
+        indexes = [
+            models.Index(fields=['post', '-created_date', '-id'],
+                         name='comment_post_created_idx'),
+        ]
+
     def get_absolute_url(self):
         return reverse('blog:post-detail', kwargs={'pk': self.post.pk})
 
@@ -155,3 +300,46 @@ class Comment(models.Model):
         String representation of object.
         """
         return self.text
+
+
+class Job(models.Model):
+    """
+    Model for queued background jobs (see jobs.py).
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (FAILED, 'Failed'),
+    ]
+
+    # Dotted path of the task function.
+    task = models.CharField(max_length=200)
+    args = models.JSONField(default=list)
+    kwargs = models.JSONField(default=dict)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    # The job is not run before this date (used to delay retries).
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_date = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        """
+        Index for workers claiming the oldest due jobs.
+        """
+        indexes = [
+            models.Index(fields=['status', 'run_at'],
+                         name='job_status_run_at_idx'),
+        ]
+
+    def __str__(self):
+        """
+        String representation of object.
+        """
+        return '{0} ({1})'.format(self.task, self.status)
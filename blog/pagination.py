@@ -0,0 +1,191 @@
+# Keyset (cursor) pagination for list views.
+#
+# Instead of OFFSET/LIMIT plus a COUNT(*), pages are fetched by filtering on
+# the last row of the previous page, e.g. (publish_date, id) < (x, y). This
+# makes every page cost the same as the first. Page links carry an opaque
+# cursor token rather than a page number, so page totals are not available.
+
+import base64
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404
+
+
+class CursorPage:
+    """
+    A page of results for cursor pagination, used in place of Django's Page.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, has_next, has_previous, next_url,
+                 previous_url, first_url):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.next_url = next_url
+        self.previous_url = previous_url
+        self.first_url = first_url
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def encode_cursor(direction, value, pk):
+    """
+    Returns an opaque token for the row (value, pk) and direction ('n' for
+    next, 'p' for previous).
+    """
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    data = json.dumps([direction, value, pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def in_bigint_range(value):
+    """
+    Returns whether the integer fits a 64-bit signed database column.
+    """
+    return -2 ** 63 <= value < 2 ** 63
+
+
+def decode_cursor(token, field):
+    """
+    Returns (direction, value, pk) from a cursor token for rows ordered by
+    the model field, with value converted to the field's type. Raises Http404
+    if the token is invalid.
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        direction, value, pk = json.loads(base64.urlsafe_b64decode(padded))
+        value = field.to_python(value)
+    except (TypeError, ValueError, ValidationError):
+        raise Http404("Invalid cursor")
+    # JSON booleans are decoded as bool, a subclass of int.
+    if (direction not in ('n', 'p') or value is None
+            or type(pk) is not int or not in_bigint_range(pk)
+            or (isinstance(value, int) and not in_bigint_range(value))):
+        raise Http404("Invalid cursor")
+    return direction, value, pk
+
+
+def row_value(row, name):
+    """
+    Returns the value of name from a model instance or values() row.
+    """
+    if isinstance(row, dict):
+        return row[name]
+    return getattr(row, name)
+
+
+class CursorPaginationMixin:
+    """
+    Mixin for ListView adding an opt-in cursor pagination mode, enabled with
+    the BLOG_CURSOR_PAGINATION setting.
+
+    Cursor pagination is used when the queryset is ordered by one of
+    cursor_fields (ascending or descending); the primary key breaks ties.
+    Any other ordering falls back to the standard paginator. Querysets of
+    values() rows must include the cursor field and pk.
+    """
+    cursor_fields = ()
+    cursor_kwarg = 'cursor'
+
+    def is_cursor_pagination_enabled(self):
+        return settings.BLOG_CURSOR_PAGINATION
+
+    def get_cursor_ordering(self, queryset):
+        """
+        Returns (field, descending) if the queryset ordering supports cursor
+        pagination, otherwise None.
+        """
+        order_by = queryset.query.order_by
+        if len(order_by) != 1 or not isinstance(order_by[0], str):
+            return None
+        field = order_by[0].lstrip('-')
+        if field not in self.cursor_fields:
+            return None
+        return field, order_by[0].startswith('-')
+
+    def get_cursor_url(self, token=None):
+        """
+        Returns the query string for the current request with the cursor set
+        to token (or removed if token is None).
+        """
+        query = self.request.GET.copy()
+        query.pop(self.page_kwarg, None)
+        query.pop(self.cursor_kwarg, None)
+        if token is not None:
+            query[self.cursor_kwarg] = token
+        return '?' + query.urlencode()
+
+    def paginate_queryset(self, queryset, page_size):
+        """
+        Additional to base, paginates by cursor if enabled and supported by
+        the queryset ordering.
+        """
+        ordering = self.get_cursor_ordering(queryset)
+        if not self.is_cursor_pagination_enabled() or ordering is None:
+            return super().paginate_queryset(queryset, page_size)
+
+        field, descending = ordering
+        token = self.request.GET.get(self.cursor_kwarg)
+        direction = 'n'
+
+        if token:
+            direction, value, pk = decode_cursor(
+                token, queryset.model._meta.get_field(field))
+
+            # Rows after the cursor in the requested direction.
+            after = (direction == 'n') == descending
+            lookup = 'lt' if after else 'gt'
+            queryset = queryset.filter(
+                Q(**{'{0}__{1}'.format(field, lookup): value})
+                | Q(**{field: value, 'pk__{0}'.format(lookup): pk}))
+
+        # Order by the cursor field and pk, reversed when paging backwards.
+        forwards = '-' if descending else ''
+        backwards = '' if descending else '-'
+        prefix = forwards if direction == 'n' else backwards
+        queryset = queryset.order_by(prefix + field, prefix + 'pk')
+
+        # Fetch one extra row to find if there is a further page.
+        object_list = list(queryset[:page_size + 1])
+        has_more = len(object_list) > page_size
+        object_list = object_list[:page_size]
+        if direction == 'p':
+            object_list.reverse()
+
+        if direction == 'n':
+            has_next, has_previous = has_more, bool(token)
+        else:
+            has_next, has_previous = True, has_more
+
+        # An empty page has no rows to take cursors from.
+        next_url = previous_url = None
+        has_next = has_next and bool(object_list)
+        has_previous = has_previous and bool(object_list)
+        if object_list:
+            first, last = object_list[0], object_list[-1]
+            next_url = self.get_cursor_url(encode_cursor(
+                'n', row_value(last, field), row_value(last, 'pk')))
+            previous_url = self.get_cursor_url(encode_cursor(
+                'p', row_value(first, field), row_value(first, 'pk')))
+
+        page = CursorPage(object_list, has_next, has_previous, next_url,
+                          previous_url, self.get_cursor_url())
+        return (None, page, object_list, page.has_other_pages())
@@ -0,0 +1,96 @@
+# Full-text search for posts.
+#
+# On PostgreSQL, posts are matched against a stored, GIN-indexed search
+# vector built from the title, subheading and HTML-stripped body text, and
+# ranked with ts_rank. On other databases (e.g. SQLite for local testing)
+# the search falls back to case-insensitive containment with a simple
+# weighted rank.
+
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.utils.html import strip_tags
+
+# Weights given to each field, highest first.
+TITLE_WEIGHT = 'A'
+SUBHEADING_WEIGHT = 'B'
+TEXT_WEIGHT = 'C'
+
+# Fields the search vector is built from.
+SEARCH_FIELDS = ('title', 'subheading', 'text')
+
+
+def is_full_text_enabled():
+    """
+    Returns True if the database supports the full-text search engine.
+    """
+    return connection.vendor == 'postgresql'
+
+
+def build_search_vector(post):
+    """
+    Returns a weighted search vector expression for the post.
+    """
+    # The body is stored as CKEditor HTML, so tags are stripped in Python
+    # before it is passed to the database to avoid indexing markup.
+    return (SearchVector(Value(post.title), weight=TITLE_WEIGHT,
+                         config='english')
+            + SearchVector(Value(post.subheading or ''),
+                           weight=SUBHEADING_WEIGHT, config='english')
+            + SearchVector(Value(strip_tags(post.text or '')),
+                           weight=TEXT_WEIGHT, config='english'))
+
+
+def search_text(post):
+    """
+    Returns the values of the post's searched fields, or None if any of them
+    is deferred.
+    """
+    if post.get_deferred_fields().intersection(SEARCH_FIELDS):
+        return None
+    return tuple(getattr(post, name) for name in SEARCH_FIELDS)
+
+
+def update_search_vector(post, created=False, update_fields=None):
+    """
+    Stores the search vector for a saved post, unless its searched fields
+    are unchanged since it was loaded (see signals.py) or were not saved.
+    Does nothing if full-text search is not supported by the database.
+    """
+    if not is_full_text_enabled():
+        return
+    if update_fields is not None and not set(update_fields).intersection(
+            SEARCH_FIELDS):
+        return
+    text = search_text(post)
+    if (not created and text is not None
+            and text == getattr(post, '_stored_search_text', None)):
+        return
+    type(post).objects.using(post._state.db).filter(pk=post.pk).update(
+        search_vector=build_search_vector(post))
+    post._stored_search_text = text
+
+
+def search_posts(queryset, query):
+    """
+    Filters the post queryset by the search query and annotates each post
+    with a relevance rank (higher is more relevant).
+    """
+    if is_full_text_enabled():
+        search_query = SearchQuery(query, config='english')
+        return (queryset
+                .filter(search_vector=search_query)
+                .annotate(rank=SearchRank('search_vector', search_query)))
+
+    # Fallback: match any field, ranking title matches above subheading
+    # matches above body matches.
+    return (queryset
+            .filter(Q(title__icontains=query)
+                    | Q(subheading__icontains=query)
+                    | Q(text__icontains=query))
+            .annotate(rank=Case(
+                When(title__icontains=query, then=Value(3)),
+                When(subheading__icontains=query, then=Value(2)),
+                default=Value(1),
+                output_field=IntegerField())))
@@ -0,0 +1,146 @@
+# Synthetic blog content for benchmarks and local testing.
+#
+# generate_records() yields archive records (see archive.py) for new users'
+# tags, posts with CKEditor style HTML bodies, post tags and comments, so
+# they are created with the archive Importer: in chunks with bulk_create,
+# with search vectors, stored counts and caches updated at the end. Content
+# is generated from a seeded random generator, so the same arguments give
+# the same data.
+
+import random
+from datetime import timedelta
+
+from django.utils import timezone
+from django.utils.text import slugify
+
+from . import models
+
+WORDS = (
+    'energy solar wind power grid battery storage carbon climate policy '
+    'market price demand supply renewable efficiency heat pump transport '
+    'electric vehicle charging network investment research innovation '
+    'community local national global future transition emissions target '
+    'report analysis data growth cost benefit risk resilience design '
+    'building home industry water waste recycling material circular '
+    'economy finance regulation planning project delivery'
+).split()
+
+LINK = '<a href="https://example.com/{0}">{0}</a>'
+
+
+def sentence(rng, words=(6, 16)):
+    text = ' '.join(rng.choice(WORDS) for i in range(rng.randint(*words)))
+    return text[0].upper() + text[1:] + '.'
+
+
+def paragraph(rng):
+    return ' '.join(sentence(rng) for i in range(rng.randint(2, 6)))
+
+
+def post_body(rng):
+    """
+    Returns a post body in the HTML CKEditor produces: paragraphs with
+    inline formatting and links, headings, lists and quotes.
+    """
+    blocks = []
+    for i in range(rng.randint(4, 12)):
+        kind = rng.random()
+        if kind < 0.1:
+            blocks.append('<h2>{0}</h2>'.format(sentence(rng, (2, 6))[:-1]))
+        elif kind < 0.2:
+            blocks.append('<ul>{0}</ul>'.format(''.join(
+                '<li>{0}</li>'.format(sentence(rng, (3, 8)))
+                for j in range(rng.randint(2, 5)))))
+        elif kind < 0.25:
+            blocks.append('<blockquote><p>{0}</p></blockquote>'.format(
+                paragraph(rng)))
+        else:
+            words = paragraph(rng).split(' ')
+            emphasis = rng.randrange(len(words))
+            words[emphasis] = '<strong>{0}</strong>'.format(words[emphasis])
+            if rng.random() < 0.3:
+                link = rng.randrange(len(words))
+                words[link] = LINK.format(words[link])
+            blocks.append('<p>{0}</p>'.format(' '.join(words)))
+    return '\n\n'.join(blocks)
+
+
+def next_pk(model):
+    return (model.objects.order_by('-pk')
+            .values_list('pk', flat=True).first() or 0) + 1
+
+
+def generate_records(num_tags=20, num_posts=200, num_comments=2000,
+                     num_users=20, tags_per_post=(1, 4), draft_ratio=0.1,
+                     seed=0):
+    """
+    Yields archive records of new tags, posts, post tags and comments, by
+    num_users new users.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    # Keeps names unique across runs.
+    run = '{0}-{1}'.format(seed, next_pk(models.Post))
+    usernames = ['seed-{0}-{1}'.format(run, i) for i in range(num_users)]
+
+    tag_pk = next_pk(models.Tag)
+    tag_pks = list(range(tag_pk, tag_pk + num_tags))
+    for pk in tag_pks:
+        name = '{0} {1}'.format(
+            ' '.join(rng.choice(WORDS) for i in range(2)), pk).title()
+        yield {'model': 'blog.tag', 'pk': pk, 'fields': {
+            'name': name,
+            'slug': slugify(name),
+            'subheading': sentence(rng),
+            'image': '',
+            'overview': post_body(rng),
+        }}
+
+    post_pk = next_pk(models.Post)
+    posts = []
+    for pk in range(post_pk, post_pk + num_posts):
+        created = now - timedelta(seconds=rng.randint(0, 2 * 365 * 86400))
+        published = (created + timedelta(hours=rng.randint(1, 72))
+                     if rng.random() >= draft_ratio else None)
+        edited = (min(published + timedelta(days=rng.randint(1, 30)), now)
+                  if published and rng.random() < 0.2 else None)
+        posts.append((pk, published))
+        yield {'model': 'blog.post', 'pk': pk, 'fields': {
+            'author': rng.choice(usernames),
+            'title': '{0} {1}'.format(sentence(rng, (3, 8))[:-1][:80], pk),
+            'subheading': sentence(rng),
+            'image': '',
+            'created_date': created,
+            'publish_date': published,
+            'edited_date': edited,
+            'text': post_body(rng),
+        }}
+
+    post_tag_pk = next_pk(models.Post.tags.through)
+    for pk, published in posts:
+        if not tag_pks:
+            break
+        count = min(rng.randint(*tags_per_post), len(tag_pks))
+        for tag in sorted(rng.sample(tag_pks, count)):
+            yield {'model': 'blog.post_tags', 'pk': post_tag_pk,
+                   'fields': {'post': pk, 'tag': tag}}
+            post_tag_pk += 1
+
+    # Comments go on published posts, most on the newest posts.
+    published = sorted((post for post in posts if post[1]),
+                       key=lambda post: post[1], reverse=True)
+    if not published:
+        return
+    comment_pk = next_pk(models.Comment)
+    for pk in range(comment_pk, comment_pk + num_comments):
+        post, publish_date = published[
+            min(int(rng.expovariate(5 / len(published))), len(published) - 1)]
+        created = publish_date + timedelta(
+            seconds=rng.randint(60, 60 * 86400))
+        yield {'model': 'blog.comment', 'pk': pk, 'fields': {
+            'post': post,
+            'author': rng.choice(usernames),
+            'created_date': min(created, now),
+            'edited_date': None,
+            'text': paragraph(rng),
+        }}
@@ -0,0 +1,196 @@
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_init, post_save, pre_delete)
+from django.dispatch import receiver
+
+from . import autocomplete, cache, models, search, sitemaps, tasks
+
+
+### Tag post counts ###
+@receiver(m2m_changed, sender=models.Post.tags.through)
+def post_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Updates tag post counts when tags are added to or removed from posts.
+    """
+    # Before a clear, store the affected tags as pk_set is not given after.
+    if action == 'pre_clear':
+        if reverse:
+            instance._cleared_tag_pks = {instance.pk}
+        else:
+            instance._cleared_tag_pks = set(
+                instance.tags.values_list('pk', flat=True))
+        return
+
+    if action == 'post_clear':
+        tag_pks = getattr(instance, '_cleared_tag_pks', set())
+    elif action in ('post_add', 'post_remove'):
+        # For reverse changes (tag.posts.add()) the instance is the tag.
+        tag_pks = {instance.pk} if reverse else pk_set
+    else:
+        return
+
+    models.Tag.objects.filter(pk__in=tag_pks).update_num_posts()
+
+
+@receiver(post_save, sender=models.Post)
+def post_saved(sender, instance, created, **kwargs):
+    """
+    Updates tag post counts when a post is saved, as it may have been
+    published. New posts have no tags until the M2M relation is saved.
+    """
+    if not created:
+        models.Tag.objects.filter(posts=instance).update_num_posts()
+
+
+@receiver(pre_delete, sender=models.Post)
+def post_deleting(sender, instance, **kwargs):
+    """
+    Stores the tags of a post being deleted, as the M2M rows are removed
+    without sending m2m_changed.
+    """
+    instance._deleted_tag_pks = list(
+        instance.tags.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=models.Post)
+def post_deleted(sender, instance, **kwargs):
+    """
+    Updates tag post counts and removes the cached latest comments once a
+    post has been deleted.
+    """
+    models.Tag.objects.filter(
+        pk__in=getattr(instance, '_deleted_tag_pks', [])).update_num_posts()
+    cache.invalidate_latest_comments(instance.pk)
+
+
+### Post comments ###
+@receiver(post_save, sender=models.Comment)
+@receiver(post_delete, sender=models.Comment)
+def comment_changed(sender, instance, created=False, **kwargs):
+    """
+    Updates the post's comment count when a comment is added or deleted, and
+    invalidates its cached latest comments on any change. Skipped for
+    comments deleted with their post.
+    """
+    if (instance.post_id is None
+            or instance.post_id in models.deleting_post_pks):
+        return
+    if created or kwargs['signal'] is post_delete:
+        models.Post.objects.filter(pk=instance.post_id).update_num_comments()
+    cache.invalidate_latest_comments(instance.post_id)
+
+
+### Page cache invalidation ###
+@receiver(post_save, sender=models.Post)
+@receiver(post_save, sender=models.Tag)
+@receiver(post_save, sender=models.Comment)
+@receiver(post_delete, sender=models.Post)
+@receiver(post_delete, sender=models.Tag)
+@receiver(post_delete, sender=models.Comment)
+@receiver(m2m_changed, sender=models.Post.tags.through)
+def content_changed(sender, instance, **kwargs):
+    """
+    Invalidates cached pages when posts, tags or comments change. Comments
+    deleted with their post are covered by the post's delete.
+    """
+    if (sender is models.Comment
+            and instance.post_id in models.deleting_post_pks):
+        return
+    cache.bump_version(cache.PAGES)
+
+
+@receiver(post_save, sender=models.Post)
+@receiver(post_save, sender=models.Tag)
+@receiver(post_delete, sender=models.Post)
+@receiver(post_delete, sender=models.Tag)
+@receiver(m2m_changed, sender=models.Post.tags.through)
+def feed_content_changed(sender, **kwargs):
+    """
+    Invalidates cached feeds when posts or tags change.
+    """
+    cache.bump_version(cache.FEEDS)
+
+
+@receiver(post_save, sender=models.Post)
+@receiver(post_delete, sender=models.Post)
+def post_sitemap_changed(sender, **kwargs):
+    """
+    Invalidates the cached post and tag sitemaps when posts change (tags are
+    last modified when their latest post was).
+    """
+    cache.bump_version(sitemaps.section_namespace('posts'))
+    cache.bump_version(sitemaps.section_namespace('tags'))
+
+
+@receiver(post_save, sender=models.Tag)
+@receiver(post_delete, sender=models.Tag)
+@receiver(m2m_changed, sender=models.Post.tags.through)
+def tag_sitemap_changed(sender, **kwargs):
+    """
+    Invalidates the cached tag sitemap when tags or post tags change.
+    """
+    cache.bump_version(sitemaps.section_namespace('tags'))
+
+
+### Tag lists ###
+@receiver(post_save, sender=models.Tag)
+@receiver(post_delete, sender=models.Tag)
+def tag_names_changed(sender, **kwargs):
+    """
+    Invalidates the cached tag list of search forms, and has every process
+    rebuild its tag autocomplete index, when tags change.
+    """
+    autocomplete.invalidate()
+
+
+### Search vectors ###
+@receiver(post_init, sender=models.Post)
+def search_text_loaded(sender, instance, **kwargs):
+    """
+    Stores the searched text of a post, so its search vector is only
+    rebuilt on save when the text changed. Unknown if a searched field was
+    deferred.
+    """
+    instance._stored_search_text = search.search_text(instance)
+
+
+### Image files ###
+@receiver(post_init, sender=models.Post)
+@receiver(post_init, sender=models.Tag)
+def image_loaded(sender, instance, **kwargs):
+    """
+    Stores the image name of a post or tag loaded from the database, so a
+    replaced image can be deleted on save. Unknown if the image field was
+    deferred.
+    """
+    if 'image' in instance.__dict__:
+        # Loaded instances hold the stored name; new instances may hold an
+        # uploaded file, which is not yet stored.
+        value = instance.__dict__['image']
+        instance._stored_image = value if isinstance(value, str) else ''
+    else:
+        instance._stored_image = None
+
+
+@receiver(post_save, sender=models.Post)
+@receiver(post_save, sender=models.Tag)
+def image_saved(sender, instance, **kwargs):
+    """
+    Queues deleting the previous image of a post or tag, with its
+    derivatives, when the image has been replaced or cleared.
+    """
+    stored = getattr(instance, '_stored_image', None)
+    name = instance.image.name or ''
+    if stored and stored != name:
+        tasks.delete_image.delay(stored)
+    instance._stored_image = name
+
+
+@receiver(post_delete, sender=models.Post)
+@receiver(post_delete, sender=models.Tag)
+def image_deleted(sender, instance, **kwargs):
+    """
+    Queues deleting the image of a deleted post or tag, with its
+    derivatives.
+    """
+    if instance.image:
+        tasks.delete_image.delay(instance.image.name)
@@ -0,0 +1,111 @@
+# Sitemaps of published posts, tags and the site's static pages.
+#
+# Each section is cached in its own namespace, bumped only when that
+# section's content changes (see signals.py), so crawlers are served cached
+# sections rather than walking the paginated list views.
+
+from django.contrib.sitemaps import Sitemap, views
+from django.db.models import Max, Q
+from django.db.models.functions import Coalesce
+from django.urls import reverse
+
+from . import cache, models
+
+
+class PostSitemap(Sitemap):
+    """
+    Sitemap of published posts.
+    """
+    protocol = 'https'
+
+    def items(self):
+        return (models.Post.objects
+                .filter(publish_date__isnull=False)
+                .only('pk', 'publish_date', 'edited_date')
+                .order_by('-publish_date', '-id'))
+
+    def lastmod(self, item):
+        return item.edited_date or item.publish_date
+
+
+class TagSitemap(Sitemap):
+    """
+    Sitemap of tags, last modified when their latest post was.
+    """
+    protocol = 'https'
+
+    def items(self):
+        return (models.Tag.objects
+                .annotate(lastmod=Max(
+                    Coalesce('posts__edited_date', 'posts__publish_date'),
+                    filter=Q(posts__publish_date__isnull=False)))
+                .only('slug')
+                .order_by('name'))
+
+    def lastmod(self, item):
+        return item.lastmod
+
+
+class StaticSitemap(Sitemap):
+    """
+    Sitemap of the landing page and static pages.
+    """
+    protocol = 'https'
+
+    def items(self):
+        return ['blog:landing', 'blog:tag-list', 'about', 'privacy-policy',
+                'cookie-policy', 'disclaimer']
+
+    def location(self, item):
+        return reverse(item)
+
+
+SITEMAPS = {
+    'posts': PostSitemap,
+    'tags': TagSitemap,
+    'static': StaticSitemap,
+}
+
+
+def section_namespace(section):
+    """
+    Returns the cache namespace of a sitemap section.
+    """
+    return 'sitemap-{0}'.format(section)
+
+
+def index(request):
+    """
+    Sitemap index listing each section's sitemap, cached until any section
+    changes.
+    """
+    versions = [cache.get_version(section_namespace(section))
+                for section in SITEMAPS]
+    # Sitemaps link to the scheme and host requested.
+    key = cache.make_key('sitemap-index', cache.request_origin(request),
+                         request.get_full_path(), *versions)
+    response = cache.get_page(request, key)
+    if response is not None:
+        return response
+
+    response = views.index(request, SITEMAPS,
+                           sitemap_url_name='sitemap-section')
+    return cache.store_page(request, key, response.render())
+
+
+def section(request, section):
+    """
+    Sitemap of one section, cached until the section's content changes.
+    """
+    if section not in SITEMAPS:
+        return views.sitemap(request, SITEMAPS, section=section)
+
+    key = cache.make_key(section_namespace(section),
+                         cache.request_origin(request),
+                         request.get_full_path())
+    response = cache.get_page(request, key)
+    if response is not None:
+        return response
+
+    response = views.sitemap(request, SITEMAPS, section=section)
+    return cache.store_page(request, key, response.render())
@@ -0,0 +1,44 @@
+// Suggests tag names for inputs with a data-autocomplete-url attribute, from
+// the tag autocomplete API (see blog/api.py), in a datalist per input.
+(function () {
+  'use strict';
+
+  function attach(input) {
+    var list = document.createElement('datalist');
+    list.id = input.id + '-suggestions';
+    input.setAttribute('list', list.id);
+    input.parentNode.appendChild(list);
+
+    var timer = null;
+    var controller = null;
+    input.addEventListener('input', function () {
+      clearTimeout(timer);
+      timer = setTimeout(function () {
+        var query = input.value.trim();
+        if (controller) {
+          controller.abort();
+        }
+        if (!query) {
+          list.innerHTML = '';
+          return;
+        }
+        controller = new AbortController();
+        var url = input.dataset.autocompleteUrl + '?q=' +
+          encodeURIComponent(query);
+        fetch(url, {signal: controller.signal})
+          .then(function (response) { return response.json(); })
+          .then(function (data) {
+            list.innerHTML = '';
+            (data.results || []).forEach(function (tag) {
+              var option = document.createElement('option');
+              option.value = tag.name;
+              list.appendChild(option);
+            });
+          })
+          .catch(function () {});
+      }, 150);
+    });
+  }
+
+  document.querySelectorAll('input[data-autocomplete-url]').forEach(attach);
+})();
@@ -0,0 +1,110 @@
+# Storage helpers.
+
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def move_file(storage, old_name, new_name):
+    """
+    Moves a stored file to new_name (or the next available name) without
+    downloading it where the storage allows, and returns the new name.
+
+    S3 storage copies the object server-side (CopyObject) and deletes the
+    original; local filesystem storage renames the file. Other storages
+    fall back to reading and re-saving the file.
+    """
+    new_name = storage.get_available_name(new_name)
+
+    if hasattr(storage, 'bucket'):
+        # S3Boto3Storage: keys include the storage location prefix. The
+        # metadata is replaced so the copy gets the same content type, cache
+        # headers and ACL as an upload.
+        source = {'Bucket': storage.bucket_name,
+                  'Key': storage._normalize_name(storage._clean_name(old_name))}
+        target = storage.bucket.Object(
+            storage._normalize_name(storage._clean_name(new_name)))
+        target.copy_from(CopySource=source, MetadataDirective='REPLACE',
+                         **storage._get_write_parameters(new_name))
+        storage.delete(old_name)
+        return new_name
+
+    try:
+        old_path, new_path = storage.path(old_name), storage.path(new_name)
+    except NotImplementedError:
+        # Storage without local paths.
+        with storage.open(old_name, 'rb') as f:
+            new_name = storage.save(new_name, f)
+        storage.delete(old_name)
+        return new_name
+
+    os.makedirs(os.path.dirname(new_path), exist_ok=True)
+    os.replace(old_path, new_path)
+    return new_name
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Static files storage saving content-hashed copies of files (see
+    ManifestStaticFilesStorage) along with gzip (.gz) and, if the brotli
+    package is installed, brotli (.br) compressed copies for the web server
+    to serve to clients accepting them.
+
+    Hashed names only change when a file's content does, so files can be
+    cached indefinitely and a deploy only invalidates the files changed.
+    Compressed copies that already exist are not rewritten.
+    """
+    compressed_extensions = ('.css', '.js', '.svg', '.map', '.txt', '.xml',
+                             '.json', '.html', '.ico', '.ttf', '.eot')
+    # Files smaller than this are not worth compressing.
+    min_compress_size = 256
+
+    def post_process(self, paths, dry_run=False, **options):
+        """
+        Additional to base, writes compressed copies of the hashed files.
+        """
+        # Files may be processed in several passes; the last hashed name is
+        # the one kept.
+        hashed_names = {}
+        for name, hashed_name, processed in super().post_process(
+                paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed_names[name] = hashed_name
+            yield name, hashed_name, processed
+
+        if dry_run:
+            return
+        for hashed_name in sorted(hashed_names.values()):
+            if os.path.splitext(hashed_name)[1].lower() in (
+                    self.compressed_extensions):
+                self.compress(hashed_name)
+
+    def compress(self, name):
+        """
+        Saves the compressed copies of the file name that are smaller than
+        it.
+        """
+        encoders = [('gz', lambda data: gzip.compress(data, 9, mtime=0))]
+        if brotli is not None:
+            encoders.append(('br', brotli.compress))
+
+        content = None
+        for extension, encode in encoders:
+            compressed_name = '{0}.{1}'.format(name, extension)
+            if self.exists(compressed_name):
+                continue
+            if content is None:
+                with self.open(name) as f:
+                    content = f.read()
+                if len(content) < self.min_compress_size:
+                    return
+            compressed = encode(content)
+            if len(compressed) < len(content):
+                self._save(compressed_name, ContentFile(compressed))
@@ -0,0 +1,54 @@
+# Background tasks (see jobs.py).
+
+from django.conf import settings
+from django.core import mail
+from django.core.files.storage import default_storage
+
+from . import cache, images, jobs, models
+
+
+@jobs.task
+def process_post_image(pk, name):
+    """
+    Moves a new post image out of the tmp directory and generates its
+    resized derivatives.
+    """
+    post = models.Post.objects.filter(pk=pk).first()
+    # Skip images replaced or deleted since the job was queued.
+    if post is None or post.image.name != name:
+        return
+    post.move_image_from_tmp()
+    images.process_image(post)
+    cache.bump_version(cache.PAGES)
+
+
+@jobs.task
+def process_tag_image(pk, name):
+    """
+    Generates the resized derivatives of a new tag image.
+    """
+    tag = models.Tag.objects.filter(pk=pk).first()
+    if tag is None or tag.image.name != name:
+        return
+    images.process_image(tag)
+    cache.bump_version(cache.PAGES)
+
+
+@jobs.task
+def delete_image(name):
+    """
+    Deletes a replaced or deleted image and its derivatives.
+    """
+    default_storage.delete(name)
+    images.delete_derivatives(name, default_storage)
+
+
+@jobs.task
+def send_email(message):
+    """
+    Sends an email queued by QueuedEmailBackend with BLOG_EMAIL_BACKEND.
+    """
+    message['alternatives'] = [
+        tuple(alternative) for alternative in message['alternatives']]
+    connection = mail.get_connection(settings.BLOG_EMAIL_BACKEND)
+    mail.EmailMultiAlternatives(connection=connection, **message).send()
@@ -0,0 +1,45 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from .. import images
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(field_file, sizes, css_class=''):
+    """
+    Renders an image with srcset attributes listing its resized derivatives,
+    wrapped in a picture element offering the WebP derivatives first.
+    Images without stored dimensions are rendered with the original only.
+    """
+    if not field_file:
+        return format_html('<img class="{0}" alt="">', css_class)
+
+    name = field_file.name
+    storage = field_file.storage
+    width = getattr(field_file.instance,
+                    '{0}_width'.format(field_file.field.name), None)
+    widths = images.derivative_widths(width)
+    if not width:
+        return format_html('<img class="{0}" src="{1}" alt="">',
+                           css_class, field_file.url)
+
+    # The largest candidate is the original, or its full size WebP copy.
+    fallback = [(storage.url(images.derivative_name(name, w)), w)
+                for w in widths] + [(field_file.url, width)]
+    webp = [(storage.url(images.derivative_name(name, w, webp=True)), w)
+            for w in widths]
+    webp.append((storage.url(images.derivative_name(name, None, webp=True)),
+                 width))
+
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{0}" sizes="{1}">'
+        '<img class="{2}" src="{3}" srcset="{4}" sizes="{1}" alt="">'
+        '</picture>',
+        format_html_join(', ', '{0} {1}w', webp),
+        sizes,
+        css_class,
+        field_file.url,
+        format_html_join(', ', '{0} {1}w', fallback))
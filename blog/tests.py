@@ -1,3 +1,1699 @@
-from django.test import TestCase
+import gzip
+import json
+import logging
+import os
+import posixpath
+import re
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import timedelta
+from functools import partial
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.db.utils import ConnectionHandler
+from django.http import Http404, StreamingHttpResponse
+from django.template import Context, Template
+from django.test import (
+    Client, RequestFactory, TestCase, TransactionTestCase, override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from PIL import Image
+
+from . import (
+    async_views, autocomplete, db, forms, images, jobs, middleware, models,
+    pagination, search, signals, storage, tasks, timing, warmup)
+from . import cache as cache_module
+from .mail import AdminEmailHandler
+
+
+def create_tag(name):
+    """
+    Creates and returns a tag with the minimum required fields.
+    """
+    return models.Tag.objects.create(name=name, subheading=name,
+                                     overview=name)
+
+
+def create_post(title, author, tags=(), published=True):
+    """
+    Creates and returns a post linked to the given tags.
+    """
+    post = models.Post.objects.create(
+        title=title, author=author, subheading=title, text='<p>text</p>',
+        publish_date=timezone.now() if published else None)
+    post.tags.set(tags)
+    return post
+
+
+### Query count tests ###
+@override_settings(BLOG_PAGE_CACHE_TIMEOUT=0)
+class ListingQueryCountTests(TestCase):
+    """
+    Checks post card listings run a fixed number of queries, independent of
+    the number of posts displayed.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(
+            'staff', password='password', is_staff=True)
+        cls.tags = [create_tag('Tag {0}'.format(i)) for i in range(3)]
+
+    def add_posts(self, count, published=True):
+        """
+        Adds posts, each linked to every tag.
+        """
+        start = models.Post.objects.count()
+        for i in range(start, start + count):
+            create_post('Post {0}'.format(i), self.staff, self.tags, published)
+
+    def count_queries(self, url):
+        """
+        Returns the number of queries run when fetching url.
+        """
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def assertConstantQueries(self, url, published=True, login=False):
+        """
+        Asserts the query count for url does not grow with the post count.
+        """
+        if login:
+            self.client.force_login(self.staff)
+        self.add_posts(1, published)
+        # Fills the cached tag list read by search forms.
+        self.count_queries(url)
+        few = self.count_queries(url)
+        self.add_posts(11, published)
+        many = self.count_queries(url)
+        self.assertEqual(few, many)
+
+    def test_landing(self):
+        self.assertConstantQueries(reverse('blog:landing'))
+
+    def test_search(self):
+        self.assertConstantQueries(reverse('blog:post-search'))
+
+    def test_pre_search(self):
+        self.assertConstantQueries(reverse(
+            'blog:post-pre-search', kwargs={'slug': self.tags[0].slug}))
+
+    def test_user_drafts(self):
+        self.assertConstantQueries(
+            reverse('blog:user-post-list', kwargs={'username': 'staff'}),
+            published=False, login=True)
+
+    def test_tag_overview(self):
+        self.assertConstantQueries(reverse(
+            'blog:tag-overview', kwargs={'slug': self.tags[0].slug}))
+
+
+### Search tests ###
+class SearchViewTests(TestCase):
+    """
+    Checks post search using the database's search engine (the fallback
+    engine on SQLite).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+        cls.in_title = create_post('Solar power', cls.author)
+        cls.in_text = create_post('Energy', cls.author)
+        cls.in_text.text = '<p>Rooftop <strong>solar</strong> panels</p>'
+        cls.in_text.save()
+        cls.unrelated = create_post('Recycling', cls.author)
+        cls.draft = create_post('Solar draft', cls.author, published=False)
+
+    def search(self, query, order='2'):
+        response = self.client.get(reverse('blog:post-search'), {
+            'post_input': query, 'order_input': order})
+        self.assertEqual(response.status_code, 200)
+        return list(response.context['posts'])
+
+    def test_searches_body_text(self):
+        self.assertIn(self.in_text, self.search('rooftop'))
+
+    def test_ranks_title_matches_first(self):
+        self.assertEqual(self.search('solar'), [self.in_title, self.in_text])
+
+    def test_empty_query_returns_all_published(self):
+        self.assertEqual(len(self.search('', order='0')), 3)
+
+
+class SearchVectorTests(TestCase):
+    """
+    Checks a post's search vector is only rebuilt on save when its searched
+    text changed (the vector is stored on PostgreSQL only, so the update is
+    faked here).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+
+    def setUp(self):
+        enabled = mock.patch.object(
+            search, 'is_full_text_enabled', return_value=True)
+        build = mock.patch.object(
+            search, 'build_search_vector', return_value=None)
+        enabled.start()
+        self.addCleanup(enabled.stop)
+        self.build = build.start()
+        self.addCleanup(build.stop)
+
+    def test_updated_when_text_changed(self):
+        post = create_post('Solar power', self.author, published=False)
+        self.assertEqual(self.build.call_count, 1)
+
+        post = models.Post.objects.get(pk=post.pk)
+        post.publish()
+        post.save(update_fields=['edited_date'])
+        self.assertEqual(self.build.call_count, 1)
+
+        post.text = '<p>Rooftop panels</p>'
+        post.save()
+        self.assertEqual(self.build.call_count, 2)
+        post.save()
+        self.assertEqual(self.build.call_count, 2)
+
+    def test_updated_when_text_deferred(self):
+        post = create_post('Solar power', self.author)
+        post = models.Post.objects.only('title').get(pk=post.pk)
+        post.save(update_fields=['title'])
+        self.assertEqual(self.build.call_count, 2)
+
+
+### Tag post count tests ###
+class TagPostCountTests(TestCase):
+    """
+    Checks the stored number of published posts on tags is kept current.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+        cls.tag = create_tag('Energy')
+
+    def assertNumPosts(self, expected):
+        self.tag.refresh_from_db()
+        self.assertEqual(self.tag.num_posts, expected)
+
+    def test_add_and_remove(self):
+        post = create_post('Post', self.author, [self.tag])
+        self.assertNumPosts(1)
+        post.tags.remove(self.tag)
+        self.assertNumPosts(0)
+
+    def test_reverse_add_and_clear(self):
+        post = create_post('Post', self.author)
+        self.tag.posts.add(post)
+        self.assertNumPosts(1)
+        self.tag.posts.clear()
+        self.assertNumPosts(0)
+
+    def test_drafts_not_counted_until_published(self):
+        post = create_post('Post', self.author, [self.tag], published=False)
+        self.assertNumPosts(0)
+        post.publish()
+        self.assertNumPosts(1)
+
+    def test_delete(self):
+        post = create_post('Post', self.author, [self.tag])
+        post.delete()
+        self.assertNumPosts(0)
+
+    def test_rebuild_command(self):
+        create_post('Post', self.author, [self.tag])
+        models.Tag.objects.update(num_posts=0)
+        call_command('rebuild_tag_counts', stdout=StringIO())
+        self.assertNumPosts(1)
+
+
+### Post comment tests ###
+@override_settings(
+    BLOG_PAGE_CACHE_TIMEOUT=0,
+    CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class PostCommentTests(TestCase):
+    """
+    Checks the stored comment count and cached latest comments of posts are
+    kept current by the comment views.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            'author', first_name='Ada', last_name='Lovelace')
+        cls.post = create_post('Post', cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.author)
+        self.url = reverse('blog:post-detail', kwargs={'pk': self.post.pk})
+
+    def add_comments(self, count):
+        for i in range(count):
+            models.Comment.objects.create(
+                post=self.post, author=self.author, text='Comment {0}'.format(i))
+
+    def assertNumComments(self, expected):
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.num_comments, expected)
+
+    def test_count_maintained_by_views(self):
+        self.client.post(self.url, {'text': 'First'})
+        self.assertNumComments(1)
+        comment = models.Comment.objects.get()
+        self.client.post(reverse(
+            'blog:comment-delete', kwargs={'pk': comment.pk}))
+        self.assertNumComments(0)
+
+    def test_latest_comments_cached(self):
+        self.add_comments(12)
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.context['comments']), 10)
+        self.assertContains(response, 'Ada Lovelace')
+        self.assertContains(response, 'All comments')
+
+        # The comments and their authors are now read from the cache.
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(self.url)
+        self.assertFalse([query for query in context.captured_queries
+                          if 'blog_comment"."text' in query['sql']])
+
+    def test_constant_queries(self):
+        self.add_comments(1)
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(self.url)
+        few = len(context.captured_queries)
+        self.add_comments(30)
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(self.url)
+        self.assertEqual(len(context.captured_queries), few)
+
+    def test_edit_invalidates_latest_comments(self):
+        self.add_comments(1)
+        self.client.get(self.url)
+        comment = models.Comment.objects.get()
+        self.client.post(reverse(
+            'blog:comment-update', kwargs={'pk': comment.pk}),
+            {'text': 'Edited comment'})
+        self.assertContains(self.client.get(self.url), 'Edited comment')
+
+    def test_post_delete_skips_comment_signals(self):
+        def delete_post(num_comments, queryset=False):
+            post = create_post('Deleted', self.author)
+            models.Comment.objects.bulk_create([
+                models.Comment(post=post, author=self.author, text='Comment')
+                for i in range(num_comments)])
+            with mock.patch.object(
+                    signals.cache, 'bump_version',
+                    wraps=signals.cache.bump_version) as bump_version:
+                with CaptureQueriesContext(connection) as context:
+                    if queryset:
+                        models.Post.objects.filter(pk=post.pk).delete()
+                    else:
+                        post.delete()
+            pages = [call for call in bump_version.call_args_list
+                     if call.args == (cache_module.PAGES,)]
+            self.assertEqual(len(pages), 1)
+            return len(context.captured_queries)
+
+        self.assertEqual(delete_post(1), delete_post(50))
+        self.assertEqual(delete_post(1, queryset=True),
+                         delete_post(50, queryset=True))
+        self.assertFalse(models.deleting_post_pks)
+
+        # Comments deleted on their own still update the post.
+        self.add_comments(2)
+        models.Comment.objects.first().delete()
+        self.assertNumComments(1)
+
+
+### Cursor pagination tests ###
+@override_settings(BLOG_CURSOR_PAGINATION=True, BLOG_PAGE_CACHE_TIMEOUT=0)
+class CursorPaginationTests(TestCase):
+    """
+    Checks cursor pagination visits every post once in order, in both
+    directions.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+        for i in range(30):
+            create_post('Post {0}'.format(i), cls.author)
+        # Share publish dates between posts so the pk tie-break is used.
+        date = timezone.now()
+        for i, post in enumerate(models.Post.objects.order_by('pk')):
+            models.Post.objects.filter(pk=post.pk).update(
+                publish_date=date - timedelta(days=i // 4))
+        cls.expected = list(models.Post.objects.order_by(
+            '-publish_date', '-pk').values_list('pk', flat=True))
+
+    def get_page(self, query=''):
+        response = self.client.get(reverse('blog:post-search') + query)
+        self.assertEqual(response.status_code, 200)
+        return response.context['page_obj']
+
+    def test_walk_forwards_and_backwards(self):
+        pages = [self.get_page()]
+        while pages[-1].has_next():
+            pages.append(self.get_page(pages[-1].next_url))
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(
+            [post.pk for page in pages for post in page], self.expected)
+
+        page = pages[-1]
+        for expected in reversed(pages[:-1]):
+            page = self.get_page(page.previous_url)
+            self.assertEqual(list(page), list(expected))
+        self.assertFalse(page.has_previous())
+
+    def test_deep_page_queries(self):
+        third_url = self.get_page(self.get_page().next_url).next_url
+        with CaptureQueriesContext(connection) as first_queries:
+            self.get_page()
+        with CaptureQueriesContext(connection) as third_queries:
+            self.get_page(third_url)
+        self.assertEqual(len(third_queries), len(first_queries))
+
+    def test_invalid_cursor(self):
+        now = timezone.now()
+        for token in ('invalid',
+                      pagination.encode_cursor('x', now, 1),
+                      pagination.encode_cursor('n', None, 1),
+                      pagination.encode_cursor('n', [1], 1),
+                      pagination.encode_cursor('n', 'not a date', 1),
+                      pagination.encode_cursor('n', now, None),
+                      pagination.encode_cursor('n', now, 'x'),
+                      pagination.encode_cursor('n', now, True),
+                      pagination.encode_cursor('n', now, 10 ** 30)):
+            response = self.client.get(
+                reverse('blog:post-search'), {'cursor': token})
+            self.assertEqual(response.status_code, 404, token)
+
+        # Integer cursor values out of the database's range.
+        token = pagination.encode_cursor('n', 10 ** 30, 1)
+        response = self.client.get(reverse('blog:api-tag-list'),
+                                   {'cursor': token, 'order_input': 0})
+        self.assertEqual(response.status_code, 404)
+        token = pagination.encode_cursor('n', now, -10 ** 30)
+        response = self.client.get(reverse('blog:api-post-list'),
+                                   {'cursor': token})
+        self.assertEqual(response.status_code, 404)
+
+
+### Query plan tests ###
+@override_settings(BLOG_PAGE_CACHE_TIMEOUT=0)
+class QueryPlanTests(TestCase):
+    """
+    Runs EXPLAIN on every query made by each view against a seeded dataset
+    and fails if a blog table is read by a sequential scan.
+    """
+    # Tables expected to be read through an index. The tag table is small and
+    # is read in full for the search form's topic choices.
+    indexed_tables = {'blog_post', 'blog_post_tags', 'blog_comment'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', is_staff=True)
+        cls.tags = [create_tag('Tag {0}'.format(i)) for i in range(10)]
+        for i in range(200):
+            post = create_post('Post {0}'.format(i), cls.staff,
+                               cls.tags[i % 10:i % 10 + 2],
+                               published=bool(i % 4))
+            models.Comment.objects.bulk_create(
+                models.Comment(post=post, author=cls.staff, text='Comment')
+                for _ in range(5))
+        cls.post = models.Post.objects.filter(
+            publish_date__isnull=False).first()
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+            if connection.vendor == 'postgresql':
+                # Only fall back to a sequential scan if no index can be
+                # used, as small tables are otherwise scanned regardless.
+                cursor.execute('SET enable_seqscan = off')
+
+    def tearDown(self):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('RESET enable_seqscan')
+
+    def explain(self, sql):
+        """
+        Returns the query plan of sql as a list of lines.
+        """
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('EXPLAIN ' + sql)
+                return [row[0] for row in cursor.fetchall()]
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def sequential_scans(self, plan):
+        """
+        Returns the names of tables read by a sequential scan in plan.
+        """
+        tables = set()
+        for line in plan:
+            match = (re.search(r'Seq Scan on (\w+)', line)
+                     or re.match(r'SCAN (?:TABLE )?(\w+)(?!.*USING)', line))
+            if match:
+                tables.add(match.group(1))
+        return tables
+
+    def assertIndexedQueries(self, url):
+        """
+        Asserts no query made when fetching url reads an indexed table by a
+        sequential scan.
+        """
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        for query in context.captured_queries:
+            if not query['sql'].startswith('SELECT'):
+                continue
+            plan = self.explain(query['sql'])
+            scanned = self.sequential_scans(plan) & self.indexed_tables
+            self.assertFalse(scanned, '{0}\n{1}'.format(
+                query['sql'], '\n'.join(plan)))
+
+    def test_landing(self):
+        self.assertIndexedQueries(reverse('blog:landing'))
+
+    def test_search(self):
+        self.assertIndexedQueries(reverse('blog:post-search'))
+
+    def test_pre_search(self):
+        self.assertIndexedQueries(reverse(
+            'blog:post-pre-search', kwargs={'slug': self.tags[0].slug}))
+
+    def test_user_drafts(self):
+        self.client.force_login(self.staff)
+        self.assertIndexedQueries(
+            reverse('blog:user-post-list', kwargs={'username': 'staff'}))
+
+    def test_post_detail(self):
+        self.assertIndexedQueries(self.post.get_absolute_url())
+
+    def test_comment_list(self):
+        self.assertIndexedQueries(
+            reverse('blog:post-comments', kwargs={'pk': self.post.pk}))
+
+    def test_tag_list(self):
+        self.assertIndexedQueries(reverse('blog:tag-list'))
+
+    def test_tag_overview(self):
+        self.assertIndexedQueries(self.tags[0].get_absolute_url())
+
+
+### Page cache tests ###
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'page-cache-tests'}})
+class AnonymousPageCacheTests(TestCase):
+    """
+    Checks anonymous pages are served from the cache until content changes.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+        cls.tag = create_tag('Energy')
+        cls.post = create_post('Solar power', cls.author, [cls.tag])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_repeat_request_served_from_cache(self):
+        url = reverse('blog:landing')
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        self.assertEqual(first.content, second.content)
+
+    def test_query_string_normalized(self):
+        url = reverse('blog:post-search')
+        self.client.get(url + '?order_input=0&post_input=solar')
+        with self.assertNumQueries(0):
+            self.client.get(url + '?post_input=solar&order_input=0')
+
+    def test_invalidated_on_change(self):
+        url = self.post.get_absolute_url()
+        self.client.get(url)
+        models.Comment.objects.create(
+            post=self.post, author=self.author, text='A new comment')
+        self.assertContains(self.client.get(url), 'A new comment')
+        self.post.title = 'Wind power'
+        self.post.save()
+        self.assertContains(self.client.get(url), 'Wind power')
+
+    def test_logged_in_user_bypasses_cache(self):
+        url = self.tag.get_absolute_url()
+        self.client.get(url)
+        self.client.force_login(self.author)
+        self.assertContains(self.client.get(url), 'Welcome')
+
+
+### Conditional GET tests ###
+@override_settings(BLOG_PAGE_CACHE_TIMEOUT=0, CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'conditional-get-tests'}})
+class ConditionalGetTests(TestCase):
+    """
+    Checks pages return 304 Not Modified for current validators, without
+    rendering, and a full page once the content changes.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+        cls.tag = create_tag('Energy')
+        cls.post = create_post('Solar power', cls.author, [cls.tag])
+
+    def assertRevalidates(self, url, change):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertFalse(response.has_header('Last-Modified'))
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+
+        # The validators are a single query and nothing is rendered.
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        change()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def add_comment(self):
+        models.Comment.objects.create(
+            post=self.post, author=self.author, text='Comment')
+
+    def edit_post(self):
+        self.post.edited_date = timezone.now()
+        self.post.save()
+
+    def test_post_detail(self):
+        self.assertRevalidates(self.post.get_absolute_url(), self.add_comment)
+
+    def test_tag_overview(self):
+        self.assertRevalidates(self.tag.get_absolute_url(), self.edit_post)
+
+    def test_landing(self):
+        self.assertRevalidates(reverse('blog:landing'), self.edit_post)
+
+    def test_search(self):
+        self.assertRevalidates(reverse('blog:post-search'), self.edit_post)
+
+    def assertModifiedSince(self, url, change):
+        """
+        Asserts a page is returned in full for If-Modified-Since requests
+        after a change that leaves content dates as they were.
+        """
+        self.client.get(url)
+        change()
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60))
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_modified_since_after_comment_delete(self):
+        self.add_comment()
+        self.assertModifiedSince(self.post.get_absolute_url(),
+                                 models.Comment.objects.all().delete)
+
+    def test_if_modified_since_after_tag_rename(self):
+        def rename_tag():
+            tag = models.Tag.objects.get(pk=self.tag.pk)
+            tag.name = 'Power'
+            tag.save()
+        self.assertModifiedSince(reverse('blog:landing'), rename_tag)
+
+    def test_private_pages(self):
+        self.client.force_login(self.author)
+        response = self.client.get(self.post.get_absolute_url())
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+
+    def test_unpublished_post_has_no_validators(self):
+        draft = create_post('Draft', self.author, published=False)
+        response = self.client.get(draft.get_absolute_url())
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(response.has_header('ETag'))
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'conditional-get-tests'}})
+class CachedConditionalGetTests(TestCase):
+    """
+    Checks anonymous pages served from the page cache keep their validators.
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_page_revalidates_without_queries(self):
+        url = reverse('blog:landing')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.get(url)['Cache-Control'], 'no-cache')
+
+
+### Image derivative tests ###
+def image_upload(name='photo.jpg', size=(1200, 600), image_format='JPEG'):
+    """
+    Returns an uploaded file containing a generated image.
+    """
+    output = BytesIO()
+    Image.new('RGB', size, 'green').save(output, image_format)
+    return SimpleUploadedFile(name, output.getvalue())
+
+
+class ImageDerivativeTests(TestCase):
+    """
+    Checks resized derivatives are generated for uploaded images, using
+    local filesystem storage.
+    """
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = self.settings(
+            DEFAULT_FILE_STORAGE='django.core.files.storage.FileSystemStorage',
+            MEDIA_ROOT=media_root, MEDIA_URL='/media/', BLOG_JOBS_INLINE=True)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.author = User.objects.create_user('author')
+
+    def assertDerivatives(self, field_file, widths):
+        storage = field_file.storage
+        self.assertTrue(storage.exists(
+            images.derivative_name(field_file.name, None, webp=True)))
+        for width in widths:
+            with storage.open(images.derivative_name(
+                    field_file.name, width)) as f:
+                self.assertEqual(Image.open(f).size[0], width)
+            self.assertTrue(storage.exists(
+                images.derivative_name(field_file.name, width, webp=True)))
+        self.assertFalse(storage.exists(
+            images.derivative_name(field_file.name, 1600)))
+
+    def test_post_image(self):
+        post = create_post('Post', self.author)
+        post.image = image_upload()
+        post.save()
+        post.refresh_from_db()
+        self.assertTrue(post.image.name.startswith(
+            'post_pictures/post_{0}/'.format(post.pk)))
+        self.assertEqual((post.image_width, post.image_height), (1200, 600))
+        self.assertDerivatives(post.image, [320, 640, 1024])
+
+    def test_new_post_image(self):
+        post = models.Post.objects.create(
+            title='Post', author=self.author, image=image_upload())
+        post.refresh_from_db()
+        self.assertTrue(post.image.name.startswith(
+            'post_pictures/post_{0}/'.format(post.pk)))
+        self.assertDerivatives(post.image, [320, 640, 1024])
+
+    def test_new_post_image_moved_from_tmp(self):
+        post = models.Post.objects.create(
+            title='Post', author=self.author, image=image_upload())
+        storage = post.image.storage
+        self.assertEqual(storage.listdir(models.TMP_POST_PHOTO_DIR)[1], [])
+        post.refresh_from_db()
+        self.assertTrue(storage.exists(post.image.name))
+
+    def test_tag_image(self):
+        tag = models.Tag.objects.create(
+            name='Energy', subheading='Energy', overview='Energy',
+            image=image_upload('photo.png', (700, 700), 'PNG'))
+        tag.refresh_from_db()
+        self.assertEqual(tag.image_width, 700)
+        self.assertTrue(tag.image.storage.exists(
+            images.derivative_name(tag.image.name, 640)))
+        self.assertTrue(images.derivative_name(
+            tag.image.name, 640).endswith('.png'))
+
+    def test_srcset(self):
+        post = create_post('Post', self.author)
+        post.image = image_upload()
+        post.save()
+        post.refresh_from_db()
+        html = Template(
+            '{% load blog_images %}{% responsive_image post.image "50vw" %}'
+        ).render(Context({'post': post}))
+        self.assertIn('type="image/webp"', html)
+        self.assertIn('_640w.jpg 640w', html)
+        self.assertIn('{0} 1200w'.format(post.image.url), html)
+        self.assertIn('sizes="50vw"', html)
+
+
+### Background job tests ###
+@jobs.task
+def failing_task():
+    raise ValueError('Task failed')
+
+
+class JobQueueTests(TestCase):
+    """
+    Checks side effects are queued and run by the job worker.
+    """
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = self.settings(
+            DEFAULT_FILE_STORAGE='django.core.files.storage.FileSystemStorage',
+            MEDIA_ROOT=media_root, BLOG_JOBS_INLINE=False)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.author = User.objects.create_user('author')
+
+    def run_jobs(self):
+        call_command('run_jobs', '--once', stdout=StringIO())
+
+    def test_post_image_processed_by_worker(self):
+        post = models.Post.objects.create(
+            title='Post', author=self.author, image=image_upload())
+        self.assertTrue(post.image.name.startswith(models.TMP_POST_PHOTO_DIR))
+        self.assertEqual(models.Job.objects.count(), 1)
+
+        self.run_jobs()
+        post.refresh_from_db()
+        self.assertFalse(models.Job.objects.exists())
+        self.assertTrue(post.image.name.startswith(
+            'post_pictures/post_{0}/'.format(post.pk)))
+        self.assertEqual(post.image_width, 1200)
+        self.assertTrue(post.image.storage.exists(
+            images.derivative_name(post.image.name, 640)))
+
+    def test_replaced_image_deleted_by_worker(self):
+        post = models.Post.objects.create(
+            title='Post', author=self.author, image=image_upload())
+        self.run_jobs()
+        post = models.Post.objects.get(pk=post.pk)
+        old_name, storage = post.image.name, post.image.storage
+
+        post.image = image_upload('new.jpg')
+        post.save()
+        self.assertTrue(storage.exists(old_name))
+        self.run_jobs()
+        self.assertFalse(storage.exists(old_name))
+        self.assertFalse(storage.exists(
+            images.derivative_name(old_name, 640)))
+
+        directory = posixpath.dirname(post.image.name)
+        post.delete()
+        self.run_jobs()
+        self.assertEqual(storage.listdir(directory)[1], [])
+
+    def test_failed_job_retried(self):
+        failing_task.delay()
+        with self.assertLogs('blog.jobs', 'ERROR'):
+            self.assertEqual(jobs.run_pending(), 1)
+        job = models.Job.objects.get()
+        self.assertEqual((job.status, job.attempts),
+                         (models.Job.PENDING, 1))
+        self.assertIn('Task failed', job.last_error)
+        # Not due until the retry delay has passed.
+        self.assertEqual(jobs.run_pending(), 0)
+
+        models.Job.objects.update(run_at=timezone.now(), max_attempts=2)
+        with self.assertLogs('blog.jobs', 'ERROR'):
+            jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (models.Job.FAILED, 2))
+
+    @override_settings(
+        EMAIL_BACKEND='blog.mail.QueuedEmailBackend',
+        BLOG_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+        MANAGERS=[('Manager', 'manager@example.com')])
+    def test_email_queued(self):
+        mail.mail_managers('Broken link', 'Body', html_message='<p>Body</p>')
+        self.assertEqual(len(mail.outbox), 0)
+        self.run_jobs()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['manager@example.com'])
+        self.assertEqual(mail.outbox[0].alternatives,
+                         [('<p>Body</p>', 'text/html')])
+
+
+    @override_settings(
+        EMAIL_BACKEND='blog.mail.QueuedEmailBackend',
+        BLOG_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+        MANAGERS=[('Manager', 'manager@example.com')])
+    def test_email_sent_when_queue_fails(self):
+        with mock.patch.object(tasks.send_email, 'delay',
+                               side_effect=DatabaseError):
+            mail.mail_managers('Broken link', 'Body')
+        self.assertEqual(len(mail.outbox), 1)
+
+    @override_settings(
+        EMAIL_BACKEND='blog.mail.QueuedEmailBackend',
+        BLOG_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+        ADMINS=[('Admin', 'admin@example.com')])
+    def test_error_reports_not_queued(self):
+        handlers = logging.getLogger('django').handlers
+        self.assertTrue(any(isinstance(handler, AdminEmailHandler)
+                            for handler in handlers))
+        AdminEmailHandler().send_mail('Server error', 'Traceback')
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertFalse(models.Job.objects.exists())
+
+
+### Feed tests ###
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class FeedTests(TestCase):
+    """
+    Checks the post feeds list published posts, are cached until posts
+    change and answer conditional requests.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+        cls.tag = create_tag('Energy')
+        cls.tagged = create_post('Solar power', cls.author, [cls.tag])
+        cls.untagged = create_post('Recycling', cls.author)
+        cls.draft = create_post('Draft', cls.author, [cls.tag], False)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_all_posts(self):
+        for name in ('blog:post-feed-rss', 'blog:post-feed-atom'):
+            response = self.client.get(reverse(name))
+            self.assertContains(response, 'Solar power')
+            self.assertContains(response, 'Recycling')
+            self.assertNotContains(response, 'Draft')
+
+    def test_tag_posts(self):
+        response = self.client.get(reverse(
+            'blog:tag-feed-atom', kwargs={'slug': self.tag.slug}))
+        self.assertContains(response, 'Solar power')
+        self.assertNotContains(response, 'Recycling')
+        self.assertEqual(self.client.get(reverse(
+            'blog:tag-feed-rss', kwargs={'slug': 'missing'})).status_code, 404)
+
+    @override_settings(BLOG_FEED_ITEMS=1)
+    def test_latest_posts_only(self):
+        response = self.client.get(reverse('blog:post-feed-rss'))
+        self.assertContains(response, 'Recycling')
+        self.assertNotContains(response, 'Solar power')
+
+    def test_cached_per_origin(self):
+        url = reverse('blog:post-feed-rss')
+        self.client.get(url, HTTP_HOST='a.example.com', secure=True)
+        response = self.client.get(url, HTTP_HOST='b.example.com')
+        self.assertContains(response, 'http://b.example.com/')
+        self.assertNotContains(response, 'a.example.com')
+
+    def test_cached_until_post_changes(self):
+        url = reverse('blog:post-feed-rss')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        create_post('Wind power', self.author)
+        self.assertContains(self.client.get(url), 'Wind power')
+
+    def test_conditional_get(self):
+        url = reverse('blog:post-feed-rss')
+        response = self.client.get(url)
+        self.assertFalse(response.has_header('Last-Modified'))
+        etag = response['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # Deleting an older post leaves the latest item date unchanged, so
+        # feeds are validated by ETag only.
+        models.Post.objects.filter(pk=self.tagged.pk).delete()
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=http_date(time.time()),
+            HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'Solar power')
+
+
+### Sitemap tests ###
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class SitemapTests(TestCase):
+    """
+    Checks the sitemap sections list published content and are cached until
+    their content changes.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+        cls.tag = create_tag('Energy')
+        cls.post = create_post('Solar power', cls.author, [cls.tag])
+        cls.draft = create_post('Draft', cls.author, published=False)
+
+    def setUp(self):
+        cache.clear()
+
+    def get_section(self, section):
+        return self.client.get(reverse(
+            'sitemap-section', kwargs={'section': section}))
+
+    def test_index(self):
+        response = self.client.get(reverse('sitemap-index'))
+        for section in ('posts', 'tags', 'static'):
+            self.assertContains(response, 'sitemap-{0}.xml'.format(section))
+
+    def test_cached_per_origin(self):
+        for url in (reverse('sitemap-index'),
+                    reverse('sitemap-section', kwargs={'section': 'posts'})):
+            self.client.get(url, HTTP_HOST='a.example.com')
+            response = self.client.get(url, HTTP_HOST='b.example.com')
+            self.assertContains(response, 'b.example.com')
+            self.assertNotContains(response, 'a.example.com')
+
+    def test_sections(self):
+        response = self.get_section('posts')
+        self.assertContains(response, self.post.get_absolute_url())
+        self.assertNotContains(response, self.draft.get_absolute_url())
+        self.assertContains(response, '<lastmod>')
+        self.assertContains(self.get_section('tags'),
+                            self.tag.get_absolute_url())
+        self.assertContains(self.get_section('static'), reverse('about'))
+        self.assertEqual(self.get_section('missing').status_code, 404)
+
+    def test_sections_cached_until_changed(self):
+        self.get_section('posts')
+        with self.assertNumQueries(0):
+            self.get_section('posts')
+        create_tag('Wind')
+        # Tag changes leave the post section cached.
+        with self.assertNumQueries(0):
+            self.get_section('posts')
+        self.assertContains(self.get_section('tags'), 'wind')
+
+        new_post = create_post('Wind power', self.author)
+        self.assertContains(self.get_section('posts'),
+                            new_post.get_absolute_url())
+
+    def test_conditional_get(self):
+        response = self.get_section('posts')
+        response = self.client.get(
+            reverse('sitemap-section', kwargs={'section': 'posts'}),
+            HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+
+### API tests ###
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ApiTests(TestCase):
+    """
+    Checks the JSON API returns the requested fields, pages by cursor and
+    answers conditional requests.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            'author', first_name='Ada', last_name='Lovelace')
+        cls.tag = create_tag('Energy')
+        for i in range(15):
+            create_post('Post {0}'.format(i), cls.author, [cls.tag])
+        cls.draft = create_post('Draft', cls.author, published=False)
+        cls.post = models.Post.objects.get(title='Post 0')
+        models.Comment.objects.create(
+            post=cls.post, author=cls.author, text='Comment')
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, name, kwargs=None, **params):
+        response = self.client.get(reverse(name, kwargs=kwargs), params)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        return response
+
+    def test_post_list(self):
+        data = self.get('blog:api-post-list').json()
+        self.assertEqual(len(data['results']), 12)
+        first = data['results'][0]
+        self.assertEqual(first['title'], 'Post 14')
+        self.assertEqual(first['author_name'], 'Ada Lovelace')
+        self.assertEqual(first['tags'], [{'name': 'Energy', 'slug': 'energy'}])
+        self.assertNotIn('text', first)
+
+        data = self.client.get(data['next']).json()
+        self.assertEqual([post['title'] for post in data['results']],
+                         ['Post 2', 'Post 1', 'Post 0'])
+        self.assertIsNone(data['next'])
+
+    def test_sparse_fields(self):
+        data = self.get('blog:api-post-list', fields='id,text').json()
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        # The cursor field is read even when not requested.
+        self.assertIsNotNone(data['next'])
+        response = self.get('blog:api-post-list', fields='password')
+        self.assertEqual(response.status_code, 400)
+
+    def test_search(self):
+        data = self.get('blog:api-post-list', post_input='Post 3',
+                        order_input='2', fields='title').json()
+        self.assertEqual(data['results'][0], {'title': 'Post 3'})
+
+    def test_post_detail(self):
+        data = self.get('blog:api-post-detail', {'pk': self.post.pk}).json()
+        self.assertEqual(data['text'], '<p>text</p>')
+        self.assertEqual(data['num_comments'], 1)
+        self.assertEqual(self.get('blog:api-post-detail',
+                                  {'pk': self.draft.pk}).status_code, 403)
+        self.assertEqual(self.get('blog:api-post-detail',
+                                  {'pk': 0}).status_code, 404)
+
+    def test_orphaned_draft(self):
+        draft = create_post('Orphaned draft', self.author, published=False)
+        models.Post.objects.filter(pk=draft.pk).update(author=None)
+        response = self.get('blog:api-post-detail', {'pk': draft.pk})
+        self.assertEqual(response.status_code, 403)
+        self.assertNotIn('Orphaned', response.content.decode())
+
+    def test_tags_and_comments(self):
+        data = self.get('blog:api-tag-list').json()
+        self.assertEqual(data['results'][0]['num_posts'], 15)
+        self.assertTrue(data['results'][0]['url'].endswith(
+            self.tag.get_absolute_url()))
+        data = self.get('blog:api-post-comments', {'pk': self.post.pk}).json()
+        self.assertEqual(data['results'][0]['text'], 'Comment')
+
+    def test_cached_per_origin(self):
+        url = reverse('blog:api-post-list')
+        self.client.get(url, HTTP_HOST='a.example.com', secure=True)
+        data = self.client.get(url, HTTP_HOST='b.example.com').json()
+        self.assertTrue(data['next'].startswith('http://b.example.com/'))
+        self.assertTrue(data['results'][0]['url'].startswith(
+            'http://b.example.com/'))
+
+    def test_conditional_get(self):
+        url = reverse('blog:api-post-list')
+        response = self.client.get(url)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+
+### Tag autocomplete tests ###
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class TagAutocompleteTests(TestCase):
+    """
+    Checks tag names are suggested from the prefix index, which is rebuilt
+    when tags change, and that search forms accept tags by name.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        for name in ('Solar power', 'Power grid', 'Wind', 'Heat pumps'):
+            create_tag(name)
+
+    def setUp(self):
+        cache.clear()
+        autocomplete.index.clear()
+
+    def names(self, prefix, limit=autocomplete.DEFAULT_LIMIT):
+        return [name for name, slug in autocomplete.index.search(
+            prefix, limit)]
+
+    def test_prefix_matches(self):
+        # Names starting with the prefix come first, then word matches.
+        self.assertEqual(self.names('pow'), ['Power grid', 'Solar power'])
+        self.assertEqual(self.names('  HEAT  p'), ['Heat pumps'])
+        self.assertEqual(self.names('pow', limit=1), ['Power grid'])
+        self.assertEqual(self.names(''), [])
+        self.assertEqual(self.names('x'), [])
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'amblog_cache'}})
+    def test_index_queries_once(self):
+        # With the database cache, the version check is the only query after
+        # the index is built, and is skipped within the check interval.
+        self.names('pow')
+        with self.assertNumQueries(0):
+            self.names('wind')
+        autocomplete.index.checked_at -= autocomplete.VERSION_CHECK_INTERVAL
+        with self.assertNumQueries(1):
+            self.names('wind')
+
+    def test_rebuilt_on_tag_changes(self):
+        self.assertEqual(self.names('wind'), ['Wind'])
+        tag = models.Tag.objects.get(name='Wind')
+        tag.name = 'Offshore wind'
+        tag.save()
+        self.assertEqual(self.names('off'), ['Offshore wind'])
+        tag.delete()
+        self.assertEqual(self.names('wind'), [])
+
+        # Indexes rebuild when another process bumps the shared version.
+        models.Tag.objects.bulk_create([models.Tag(
+            name='Windows', slug='windows', subheading='-', overview='-')])
+        self.assertEqual(self.names('win'), [])
+        autocomplete.cache.bump_version(autocomplete.cache.TAGS)
+        # Seen once the version is next checked.
+        self.assertEqual(self.names('win'), [])
+        autocomplete.index.checked_at -= autocomplete.VERSION_CHECK_INTERVAL
+        self.assertEqual(self.names('win'), ['Windows'])
+
+    def test_endpoint(self):
+        url = reverse('blog:api-tag-autocomplete')
+        data = self.client.get(url, {'q': 'sol'}).json()
+        self.assertEqual(data['results'],
+                         [{'name': 'Solar power', 'slug': 'solar-power'}])
+        response = self.client.get(url, {'q': 'sol', 'limit': '0'})
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(BLOG_TAG_AUTOCOMPLETE=True)
+    def test_search_form(self):
+        form = forms.SearchPostForm({'tag_input': 'wind', 'order_input': 0})
+        self.assertIn('data-autocomplete-url', str(form['tag_input']))
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['tag_input'].name, 'Wind')
+        form = forms.SearchDraftForm({'tag_input': 'Tidal', 'order_input': 0})
+        self.assertFalse(form.is_valid())
+
+        response = self.client.get(reverse('blog:post-search'),
+                                   {'tag_input': 'Wind', 'order_input': 0})
+        self.assertContains(response, 'blog/js/tag_autocomplete.js')
+        self.assertNotContains(response, '<option value="Solar power"')
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    BLOG_PAGE_CACHE_TIMEOUT=0, BLOG_TAG_AUTOCOMPLETE=False)
+class TagChoiceTests(TestCase):
+    """
+    Checks search forms read tag choices from the cached tag list, which is
+    invalidated when tags change.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tag = create_tag('Wind')
+        create_tag('Solar')
+
+    def setUp(self):
+        cache.clear()
+
+    def choices(self):
+        return [name for name, label
+                in forms.SearchPostForm().fields['tag_input'].choices]
+
+    def test_choices(self):
+        self.assertEqual(self.choices(), ['', 'Solar', 'Wind'])
+        form = forms.SearchDraftForm({'tag_input': 'Wind', 'order_input': 0})
+        with self.assertNumQueries(0):
+            self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['tag_input'].pk, self.tag.pk)
+        form = forms.SearchPostForm({'tag_input': 'Tidal', 'order_input': 0})
+        self.assertFalse(form.is_valid())
+
+    def test_invalidated_on_tag_changes(self):
+        self.choices()
+        tag = create_tag('Tidal')
+        self.assertIn('Tidal', self.choices())
+        tag.name = 'Tidal power'
+        tag.save()
+        self.assertIn('Tidal power', self.choices())
+        tag.delete()
+        self.assertEqual(self.choices(), ['', 'Solar', 'Wind'])
+
+    def test_search_page_skips_tag_table(self):
+        # No posts are listed, whose cards' tags are read from the table.
+        url = reverse('blog:post-pre-search', kwargs={'slug': 'wind'})
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertContains(response, '<option value="Wind" selected>')
+        self.assertFalse([query for query in context.captured_queries
+                          if query['sql'].startswith('SELECT')
+                          and 'FROM "blog_tag"' in query['sql']])
+
+
+### Export and import tests ###
+class ArchiveTests(TestCase):
+    """
+    Checks blog content survives an export and import, and that both can be
+    resumed.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+        cls.tag = create_tag('Energy')
+        cls.post = create_post('Solar power', cls.author, [cls.tag])
+        cls.post.image = 'post_pictures/post_1/photo.jpg'
+        cls.post.save()
+        create_post('Draft', cls.author, published=False)
+        models.Comment.objects.create(
+            post=cls.post, author=cls.author, text='Comment')
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'blog.ndjson')
+
+    def export(self, *args):
+        call_command('export_blog', self.path, *args, stdout=StringIO())
+        with open(self.path) as f:
+            return f.read().splitlines()
+
+    def test_round_trip(self):
+        lines = self.export('--chunk-size', '1')
+        self.assertEqual(len(lines), 5)
+        models.Tag.objects.all().delete()
+        models.Post.objects.all().delete()
+        User.objects.all().delete()
+
+        call_command('import_blog', self.path, '--chunk-size', '1',
+                     stdout=StringIO())
+        post = models.Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.author.username, 'author')
+        self.assertEqual(post.image.name, 'post_pictures/post_1/photo.jpg')
+        self.assertEqual(post.publish_date, self.post.publish_date)
+        self.assertEqual(list(post.tags.all()), [self.tag])
+        self.assertEqual(post.num_comments, 1)
+        self.assertEqual(models.Tag.objects.get().num_posts, 1)
+        self.assertEqual(models.Post.objects.count(), 2)
+        # New rows are given pks after the imported ones.
+        self.assertGreater(create_tag('Wind').pk, self.tag.pk)
+
+    def test_import_resumes(self):
+        self.export()
+        models.Comment.objects.all().delete()
+        output = StringIO()
+        call_command('import_blog', self.path, stdout=output)
+        self.assertIn('blog.comment: 1 imported', output.getvalue())
+        self.assertIn('blog.post: 0 imported, 2 already present',
+                      output.getvalue())
+        self.assertEqual(models.Comment.objects.count(), 1)
+
+    def test_export_resumes(self):
+        lines = self.export()
+        # Simulate an export interrupted part way through a record.
+        with open(self.path, 'w') as f:
+            f.write('\n'.join(lines[:3]) + '\n' + lines[3][:10])
+        self.assertEqual(self.export('--resume'), lines)
+
+
+### Static files tests ###
+class CompressedStaticFilesTests(TestCase):
+    """
+    Checks compressed copies are saved for static files worth compressing.
+    """
+
+    def setUp(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        self.storage = storage.CompressedManifestStaticFilesStorage(
+            location=location)
+
+    def test_compress(self):
+        content = b'body { margin: 0; }\n' * 100
+        self.storage.save('master.css', ContentFile(content))
+        self.storage.save('small.css', ContentFile(b'p {}'))
+        self.storage.compress('master.css')
+        self.storage.compress('small.css')
+        with self.storage.open('master.css.gz') as f:
+            self.assertEqual(gzip.decompress(f.read()), content)
+        self.assertFalse(self.storage.exists('small.css.gz'))
+
+
+### Compression middleware tests ###
+@override_settings(BLOG_PAGE_CACHE_TIMEOUT=0)
+class CompressionMiddlewareTests(TestCase):
+    """
+    Checks responses are compressed as accepted by the client, except for
+    pages including the CSRF token, and HTML whitespace is stripped.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+        cls.post = create_post('Post', cls.author)
+        cls.url = reverse('blog:post-detail', kwargs={'pk': cls.post.pk})
+
+    def test_gzip(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertTrue(response['ETag'].startswith('W/'))
+        self.assertIn(b'Post', gzip.decompress(response.content))
+
+        response = self.client.get(
+            self.url, HTTP_ACCEPT_ENCODING='gzip;q=0, identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_streaming(self):
+        chunks = [b'<p>chunk</p>' * 50] * 3
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        response = middleware.CompressionMiddleware(
+            lambda request: StreamingHttpResponse(iter(chunks)))(request)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(response)), b''.join(chunks))
+
+    def test_csrf_pages_not_compressed(self):
+        self.client.force_login(self.author)
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertContains(response, 'csrfmiddlewaretoken')
+
+    def test_uncompressed_content_length(self):
+        # Anonymous pages for clients without compression, and pages with
+        # the CSRF token, are sent minified but uncompressed.
+        response = self.client.get(self.url)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(int(response['Content-Length']),
+                         len(response.content))
+        self.client.force_login(self.author)
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(int(response['Content-Length']),
+                         len(response.content))
+
+    def test_minify_html(self):
+        html = ('<div>\n    <p>Text</p>\n\n\n    <pre>\n  code\n\n  more'
+                '</pre>\n</div>')
+        self.assertEqual(middleware.minify_html(html),
+                         '<div>\n<p>Text</p>\n<pre>\n  code\n\n  more'
+                         '</pre>\n</div>')
+
+
+### Cache warm-up tests ###
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class WarmCacheTests(TestCase):
+    """
+    Checks the warm_cache command compiles templates and caches the landing
+    page, top tags and recent posts.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+        cls.tag = create_tag('Energy')
+        cls.post = create_post('Solar power', cls.author, [cls.tag])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_warm_cache(self):
+        urls = warmup.page_urls()
+        self.assertIn(reverse('blog:landing'), urls)
+        self.assertIn(reverse(
+            'blog:tag-overview', kwargs={'slug': self.tag.slug}), urls)
+        self.assertIn(reverse(
+            'blog:post-detail', kwargs={'pk': self.post.pk}), urls)
+
+        out = StringIO()
+        call_command('warm_cache', stdout=out)
+        self.assertIn('(0 pages failed)', out.getvalue())
+        names = list(warmup.template_names())
+        self.assertIn('base.html', names)
+        self.assertIn('bootstrap4/field.html', names)
+        # Pages are warmed for HTTPS requests to the first allowed host.
+        with self.assertNumQueries(0):
+            Client(HTTP_HOST=warmup.get_host()).get(reverse(
+                'blog:post-detail', kwargs={'pk': self.post.pk}), secure=True)
+
+    def test_warm_pages_timeout(self):
+        # Pages are no longer rendered once the timeout has passed (here
+        # while the URLs are queried).
+        with self.assertLogs('blog.warmup', 'WARNING'):
+            pages = warmup.warm_pages(timeout=1e-9)
+        self.assertEqual(pages, [])
+        self.assertEqual(len(warmup.warm_pages(timeout=0)),
+                         len(warmup.page_urls()))
+
+
+### Async view tests ###
+@override_settings(BLOG_PAGE_CACHE_TIMEOUT=0)
+class AsyncViewTests(TransactionTestCase):
+    """
+    Checks the async landing and post detail views render the same pages as
+    the sync views, with their queries run in other threads (so the data is
+    committed rather than kept in a test transaction).
+    """
+
+    def setUp(self):
+        self.author = User.objects.create_user('author')
+        self.tag = create_tag('Energy')
+        self.post = create_post('Solar power', self.author, [self.tag])
+        models.Comment.objects.create(
+            post=self.post, author=self.author, text='First comment')
+
+    def get(self, view, url, **kwargs):
+        request = RequestFactory().get(url)
+        request.user = AnonymousUser()
+        return async_to_sync(view)(request, **kwargs)
+
+    def test_landing(self):
+        response = self.get(async_views.landing, reverse('blog:landing'))
+        self.assertContains(response, 'Solar power')
+        self.assertContains(response, 'Energy')
+
+    def test_post_detail(self):
+        response = self.get(
+            async_views.post_detail,
+            reverse('blog:post-detail', kwargs={'pk': self.post.pk}),
+            pk=self.post.pk)
+        self.assertContains(response, 'Solar power')
+        self.assertContains(response, 'First comment')
+
+        draft = create_post('Draft', self.author, published=False)
+        with self.assertRaises(PermissionDenied):
+            self.get(async_views.post_detail, '/', pk=draft.pk)
+        with self.assertRaises(Http404):
+            self.get(async_views.post_detail, '/', pk=draft.pk + 1)
+
+
+### Database connection tests ###
+class ConnectionPoolTests(TestCase):
+    """
+    Checks pooled connections are reused, limited to the pool size and
+    checked before reuse, and persistent connections are health checked.
+    """
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'db.sqlite3')
+        self.addCleanup(self.close_pools)
+
+    def close_pools(self):
+        for alias in ('pooled', 'persistent'):
+            pool = db.pools.pop(alias, None)
+            if pool is not None:
+                pool.close()
+
+    def get_connection(self, alias, **settings_dict):
+        handler = ConnectionHandler({
+            'default': {'ENGINE': 'django.db.backends.sqlite3',
+                        'NAME': self.path},
+            alias: {'ENGINE': 'blog.db.backends.sqlite3', 'NAME': self.path,
+                    **settings_dict},
+        })
+        self.addCleanup(handler.close_all)
+        return handler[alias]
+
+    def test_pool(self):
+        pool = db.ConnectionPool(max_size=2, timeout=0.05)
+        connect = partial(sqlite3.connect, self.path,
+                          check_same_thread=False)
+        first, second = pool.acquire(connect), pool.acquire(connect)
+        with self.assertLogs('blog.metrics', 'WARNING'):
+            with self.assertRaises(db.PoolTimeout):
+                pool.acquire(connect)
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+        pool.release(first)
+        self.assertIs(pool.acquire(connect), first)
+        # Connections that fail validation are replaced.
+        pool.release(second)
+        third = pool.acquire(connect, lambda conn: False)
+        self.assertIsNot(third, second)
+        self.assertEqual(pool.stats()['size'], 2)
+        self.assertEqual(pool.stats()['in_use'], 2)
+
+    def test_pooled_wrapper(self):
+        conn = self.get_connection('pooled', POOL={'MAX_SIZE': 1})
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        raw = conn.connection
+        conn.close()
+        self.assertEqual(db.pools['pooled'].stats()['idle'], 1)
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        self.assertIs(conn.connection, raw)
+
+    def test_health_check(self):
+        conn = self.get_connection(
+            'persistent', CONN_MAX_AGE=None, CONN_HEALTH_CHECKS=True)
+        conn.ensure_connection()
+        raw = conn.connection
+        # A new request checks the connection on first use.
+        conn.close_if_unusable_or_obsolete()
+        with mock.patch.object(conn, 'is_usable', return_value=False):
+            conn.ensure_connection()
+        self.assertIsNot(conn.connection, raw)
+
+
+### Server timing tests ###
+@override_settings(BLOG_SERVER_TIMING=True, BLOG_PAGE_CACHE_TIMEOUT=0)
+class ServerTimingTests(TestCase):
+    """
+    Checks requests report their query, template and storage times.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.post = create_post('Post', User.objects.create_user('author'))
+
+    def setUp(self):
+        timing.install()
+
+    def test_server_timing(self):
+        url = reverse('blog:post-detail', kwargs={'pk': self.post.pk})
+        with self.assertLogs('blog.metrics', 'INFO') as logs:
+            response = self.client.get(url)
+        header = response['Server-Timing']
+        queries = int(re.search(r'db;dur=[\d.]+;desc="(\d+) queries"',
+                                header).group(1))
+        self.assertGreater(queries, 0)
+        self.assertIn('tpl;dur=', header)
+        self.assertIn('storage;dur=', header)
+        self.assertTrue(any('view=blog:post-detail' in line
+                            and 'db_queries={0}'.format(queries) in line
+                            for line in logs.output))
+
+    @override_settings(BLOG_SERVER_TIMING=False)
+    def test_disabled(self):
+        response = self.client.get(reverse('blog:landing'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+
+### Seed and benchmark tests ###
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class SeedBlogTests(TestCase):
+    """
+    Checks seed_blog generates the requested content and benchmark_urls
+    reports every URL.
+    """
+
+    def test_seed_blog(self):
+        call_command('seed_blog', tags=3, posts=10, comments=30, users=2,
+                     stdout=StringIO())
+        self.assertEqual(models.Tag.objects.count(), 3)
+        self.assertEqual(models.Post.objects.count(), 10)
+        self.assertEqual(models.Comment.objects.count(), 30)
+        self.assertTrue(models.Post.objects.filter(
+            tags__isnull=False).exists())
+        post = models.Comment.objects.first().post
+        self.assertEqual(post.num_comments, post.comments.count())
+        self.assertIn('<p>', post.text)
+
+        # Seeding again adds new content.
+        call_command('seed_blog', tags=1, posts=1, comments=0,
+                     stdout=StringIO())
+        self.assertEqual(models.Post.objects.count(), 11)
+
+    def test_benchmark_urls(self):
+        call_command('seed_blog', tags=2, posts=4, comments=4, users=1,
+                     stdout=StringIO())
+        User.objects.create_user('staff', is_staff=True)
+        out = StringIO()
+        call_command('benchmark_urls', requests=2, warmup=0, staff='staff',
+                     stdout=out)
+        results = json.loads(out.getvalue())['results']
+        self.assertEqual(results['blog:landing']['anonymous']['status'], 200)
+        self.assertEqual(results['blog:post-create']['staff']['status'], 200)
+        self.assertIn('queries', results['blog:post-detail']['staff'])
+        self.assertNotIn('blog:logout', results)
+
+
+### Session and message storage tests ###
+@override_settings(BLOG_PAGE_CACHE_TIMEOUT=0)
+class SessionTests(TestCase):
+    """
+    Checks anonymous page views do not load or save sessions, logged in page
+    views only read theirs, and messages are kept in a cookie.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', is_staff=True)
+        cls.post = create_post('Post', cls.staff)
+
+    def test_anonymous_pages_skip_sessions(self):
+        for url in (reverse('blog:landing'),
+                    reverse('blog:post-detail', kwargs={'pk': self.post.pk}),
+                    reverse('blog:post-search')):
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse([query for query in context.captured_queries
+                              if 'django_session' in query['sql']])
+            self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+
+    def test_logged_in_page_view_reads_session_once(self):
+        self.client.force_login(self.staff)
+        url = reverse('blog:post-detail', kwargs={'pk': self.post.pk})
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        sessions = [query['sql'] for query in context.captured_queries
+                    if 'django_session' in query['sql']]
+        self.assertEqual(len(sessions), 1)
+        self.assertTrue(sessions[0].startswith('SELECT'))
+        # Nothing is written, to the session or the cache table.
+        self.assertFalse([query for query in context.captured_queries
+                          if not query['sql'].startswith('SELECT')])
+
+    def test_messages_in_cookie(self):
+        self.client.force_login(self.staff)
+        response = self.client.post(reverse(
+            'blog:post_publish', kwargs={'pk': self.post.pk}))
+        self.assertIn('messages', response.cookies)
+
+        # Reading the messages does not write to the session table.
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(response.url)
+        self.assertContains(response, 'Published!')
+        self.assertFalse([query for query in context.captured_queries
+                          if 'django_session' in query['sql']
+                          and not query['sql'].startswith('SELECT')])
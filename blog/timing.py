@@ -0,0 +1,175 @@
+# Per-request performance instrumentation, enabled by BLOG_SERVER_TIMING.
+#
+# install() (called when the app is ready) hooks database queries (with an
+# execute wrapper added to each new connection), template rendering and
+# the default storage's methods. TimingMiddleware starts a Recorder for each
+# request, which the hooks add to, and reports the totals in a
+# Server-Timing header and a log line to the blog.metrics logger tagged with
+# the view name. When disabled, nothing is hooked and the middleware is
+# removed from the stack.
+
+import contextvars
+import functools
+import logging
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends import django as django_backend
+from django.utils.functional import empty
+
+metrics = logging.getLogger('blog.metrics')
+
+# Recorder of the current request. Context variables are copied to the
+# threads async views run queries in (see async_views.py).
+current = contextvars.ContextVar('blog_timing_recorder', default=None)
+
+# Storage methods timed, which may call the storage service (e.g. S3).
+STORAGE_METHODS = ('url', 'exists', 'open', 'save', 'delete', 'size',
+                   'listdir', 'get_modified_time')
+
+
+class Recorder:
+    """
+    Totals of the time spent on queries, template rendering and storage
+    calls during a request.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.storage_calls = 0
+        self.storage_time = 0.0
+        # Depth of nested template and storage calls, so only the outermost
+        # call is timed.
+        self.template_depth = 0
+        self.storage_depth = 0
+
+    def total_time(self):
+        return time.perf_counter() - self.start
+
+    def server_timing(self):
+        """
+        Returns the Server-Timing header value (durations in ms).
+        """
+        return ', '.join([
+            'db;dur={0:.1f};desc="{1} queries"'.format(
+                self.db_time * 1000, self.db_queries),
+            'tpl;dur={0:.1f};desc="Templates"'.format(
+                self.template_time * 1000),
+            'storage;dur={0:.1f};desc="{1} calls"'.format(
+                self.storage_time * 1000, self.storage_calls),
+            'total;dur={0:.1f}'.format(self.total_time() * 1000),
+        ])
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper counting and timing queries.
+    """
+    recorder = current.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        recorder.db_time += time.perf_counter() - start
+        recorder.db_queries += 1
+
+
+def add_query_recorder(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def timed(func, kind):
+    """
+    Wraps func to add its duration to the current recorder's kind time
+    ('template' or 'storage').
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        recorder = current.get()
+        if recorder is None:
+            return func(*args, **kwargs)
+        depth = '{0}_depth'.format(kind)
+        setattr(recorder, depth, getattr(recorder, depth) + 1)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            setattr(recorder, depth, getattr(recorder, depth) - 1)
+            if not getattr(recorder, depth):
+                total = '{0}_time'.format(kind)
+                setattr(recorder, total, getattr(recorder, total)
+                        + time.perf_counter() - start)
+                if kind == 'storage':
+                    recorder.storage_calls += 1
+    wrapper.is_timed = True
+    return wrapper
+
+
+def install():
+    """
+    Hooks queries, template rendering and default storage calls, if
+    BLOG_SERVER_TIMING is set.
+    """
+    if not getattr(settings, 'BLOG_SERVER_TIMING', False):
+        return
+    connection_created.connect(
+        add_query_recorder, dispatch_uid='blog_timing_queries')
+    for connection in connections.all():
+        add_query_recorder(None, connection)
+
+    template_class = django_backend.Template
+    if not getattr(template_class.render, 'is_timed', False):
+        template_class.render = timed(template_class.render, 'template')
+
+    if default_storage._wrapped is empty:
+        default_storage._setup()
+    storage_class = type(default_storage._wrapped)
+    for name in STORAGE_METHODS:
+        method = getattr(storage_class, name, None)
+        if method is not None and not getattr(method, 'is_timed', False):
+            setattr(storage_class, name, timed(method, 'storage'))
+
+
+class TimingMiddleware:
+    """
+    Records the query count and time, template render time and storage calls
+    of each request (see install()), and reports them in a Server-Timing
+    header and a log line. Removed from the stack unless
+    BLOG_SERVER_TIMING is set.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'BLOG_SERVER_TIMING', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = Recorder()
+        token = current.set(recorder)
+        try:
+            response = self.get_response(request)
+        finally:
+            current.reset(token)
+
+        response['Server-Timing'] = recorder.server_timing()
+        match = request.resolver_match
+        metrics.info(
+            'request_timing view=%s method=%s status=%d total_ms=%.1f '
+            'db_queries=%d db_ms=%.1f template_ms=%.1f storage_calls=%d '
+            'storage_ms=%.1f',
+            match.view_name if match else '-', request.method,
+            response.status_code, recorder.total_time() * 1000,
+            recorder.db_queries, recorder.db_time * 1000,
+            recorder.template_time * 1000, recorder.storage_calls,
+            recorder.storage_time * 1000)
+        return response
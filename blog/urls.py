@@ -1,14 +1,24 @@
+from django.conf import settings
 from django.contrib.auth import views as auth_views
 from django.urls import path
 
-from . import views
+from . import api, async_views, feeds, views
 
 app_name = 'blog'
 
+# The landing and post detail pages run their queries concurrently when
+# served by ASGI (see async_views.py).
+if getattr(settings, 'BLOG_ASYNC_VIEWS', False):
+    landing_view = async_views.landing
+    post_detail_view = async_views.post_detail
+else:
+    landing_view = views.LandingPage.as_view()
+    post_detail_view = views.PostDetailView.as_view()
+
 urlpatterns = [
-    path('', views.LandingPage.as_view(), name='landing'),
+    path('', landing_view, name='landing'),
     path('post/create/', views.PostCreateView.as_view(), name='post-create'),
-    path('post/<int:pk>/', views.PostDetailView.as_view(), name='post-detail'),
+    path('post/<int:pk>/', post_detail_view, name='post-detail'),
     path('post/update/<int:pk>/', views.PostUpdateView.as_view(), name='post-update'),
     path('post/delete/<int:pk>/',views.PostDeleteView.as_view(), name='post-delete'),
     path('search/', views.SearchView.as_view(), name='post-search'),
@@ -24,5 +34,15 @@ urlpatterns = [
     path('tag/overview/<slug>/', views.TagOverviewView.as_view(), name='tag-overview'),
     path('tag/update/<slug>/', views.TagUpdateView.as_view(), name='tag-update'),
     path('tag/delete/<slug>/',views.TagDeleteView.as_view(), name='tag-delete'),
+    path('feed/rss/', feeds.LatestPostsRSSFeed(), name='post-feed-rss'),
+    path('feed/atom/', feeds.LatestPostsAtomFeed(), name='post-feed-atom'),
+    path('tag/feed/rss/<slug>/', feeds.TagPostsRSSFeed(), name='tag-feed-rss'),
+    path('tag/feed/atom/<slug>/', feeds.TagPostsAtomFeed(), name='tag-feed-atom'),
+    # Read-only JSON API (see api.py).
+    path('api/posts/', api.PostListApi.as_view(), name='api-post-list'),
+    path('api/posts/<int:pk>/', api.PostDetailApi.as_view(), name='api-post-detail'),
+    path('api/posts/<int:pk>/comments/', api.CommentListApi.as_view(), name='api-post-comments'),
+    path('api/tags/', api.TagListApi.as_view(), name='api-tag-list'),
+    path('api/tags/autocomplete/', api.TagAutocompleteApi.as_view(), name='api-tag-autocomplete'),
     path('logout/', auth_views.LogoutView.as_view(), name='logout'),
 ]
@@ -1,10 +1,12 @@
+from functools import partial
+
 from django.contrib import messages
 from django.contrib.auth.decorators import user_passes_test
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.auth.models import User
 from django.contrib.messages.views import SuccessMessageMixin
 from django.core.exceptions import PermissionDenied
-from django.db.models import Count
+from django.db.models import Count, Max, Q
 from django.db.models.functions import Lower
 from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect
@@ -13,7 +15,10 @@ from django.utils import timezone
 from django.views import View, generic
 from django.views.generic.detail import SingleObjectMixin
 
-from . import forms, models
+from . import cache, forms, models, search
+from .cache import AnonymousPageCacheMixin
+from .conditional import ConditionalGetMixin
+from .pagination import CursorPaginationMixin
 
 
 ### Authentication checkers ###
@@ -26,25 +31,78 @@ class StaffRequiredMixin(UserPassesTestMixin):
         return self.request.user.is_staff
 
 
-### LANDING VIEWS ###
-class LandingPage(generic.TemplateView):
+### Context queries ###
+class ContextQueriesMixin:
     """
-    Landing page displaying 4 most recent posts and 4 most posted topics.
+    Mixin for views whose context includes independent queries.
+
+    get_context_queries() returns querysets (evaluated while rendering) or
+    callables (called when the context is built) by context name. Async
+    views evaluate them concurrently instead (see async_views.py).
     """
-    template_name = 'blog/landing.html'
+    query_results = None
+
+    def get_context_queries(self):
+        return {}
+
+    def evaluate_queries(self, queries):
+        """
+        Returns the results of queries by name.
+        """
+        return {name: query() if callable(query) else query
+                for name, query in queries.items()}
 
     def get_context_data(self, **kwargs):
+        """
+        Additional to base, adds the results of get_context_queries().
+        """
         context = super().get_context_data(**kwargs)
+        if self.query_results is None:
+            self.query_results = self.evaluate_queries(
+                self.get_context_queries())
+        context.update(self.query_results)
+        return context
 
-        # Add tags context with 4 most posted topics
-        context['tags'] = models.Tag.objects.annotate(
-            num_posts=Count('posts')).order_by('-num_posts')[:4]
 
-        # Add posts context with 4 most recent posts
-        context['posts'] = models.Post.objects.filter(
-            publish_date__isnull=False).order_by('-publish_date')[:4]
+### Conditional GET validators ###
+def published_post_validators(queryset):
+    """
+    Returns the latest publish and edit dates and the number of published
+    posts in the queryset, for use as conditional GET validators.
+    """
+    return queryset.filter(publish_date__isnull=False).aggregate(
+        latest_publish=Max('publish_date'),
+        latest_edit=Max('edited_date'),
+        num_posts=Count('pk'))
 
-        return context
+
+### LANDING VIEWS ###
+class LandingPage(AnonymousPageCacheMixin, ConditionalGetMixin,
+                  ContextQueriesMixin, generic.TemplateView):
+    """
+    Landing page displaying 4 most recent posts and 4 most posted topics.
+    """
+    template_name = 'blog/landing.html'
+
+    def get_validators(self):
+        """
+        Returns the latest dates and number of published posts.
+        """
+        return published_post_validators(models.Post.objects.all())
+
+    def get_context_queries(self):
+        return {
+            # Add tags context with 4 most posted topics
+            'tags': models.Tag.objects.order_by('-num_posts')[:4],
+            # Add posts context with 4 most recent posts. Authors and tags
+            # are loaded in bulk so each post card does not query for its
+            # tags.
+            'posts': (models.Post.objects
+                      .filter(publish_date__isnull=False)
+                      .select_related('author')
+                      .prefetch_related('tags')
+                      .order_by('-publish_date')[:4]),
+        }
 
 
 ### POST VIEWS ###
@@ -87,12 +145,32 @@ class PostDetailView(View):
         return view(self.request, *args, **kwargs)
 
 
-class PostDisplay(generic.DetailView):
+class PostDisplay(AnonymousPageCacheMixin, ConditionalGetMixin,
+                  ContextQueriesMixin, generic.DetailView):
     """
     GET method for PostDetailView. Displays post, comments and comment form.
     """
     model = models.Post
 
+    def get_validators(self):
+        """
+        Returns the post dates with the latest dates and number of comments,
+        or None if the post does not exist or may not be viewed.
+        """
+        # Drafts are only visible to their author.
+        visible = Q(publish_date__isnull=False)
+        if self.request.user.is_authenticated:
+            visible |= Q(author=self.request.user)
+
+        return (models.Post.objects
+                .filter(visible, pk=self.kwargs.get('pk'))
+                .values('created_date', 'publish_date', 'edited_date',
+                        'num_comments')
+                .annotate(latest_comment=Max('comments__created_date'),
+                          latest_comment_edit=Max('comments__edited_date'))
+                .order_by()
+                .first())
+
     def get_object(self):
         """
         Checks if post not published and user not author. Returns post object.
@@ -102,25 +180,38 @@ class PostDisplay(generic.DetailView):
             raise PermissionDenied()
         return obj
 
+    def get_context_queries(self):
+        # Add the latest comments (cached with their authors) as additional
+        # context.
+        return {'comments': partial(cache.get_latest_comments,
+                                    self.kwargs.get('pk'))}
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        # Add comments and comment form as additional context.
+        # Add comment form as additional context.
         context['form'] = forms.CommentForm
-        context['comments'] = self.object.comments.order_by('-created_date')
 
         return context
 
 
-class SearchView(generic.ListView):
+class SearchView(AnonymousPageCacheMixin, ConditionalGetMixin,
+                 CursorPaginationMixin, generic.ListView):
     """
     List view of all posts with search, filter and sort functionality.
     """
     template_name = 'blog/search.html'
     context_object_name = "posts"
     paginate_by = 12
+    cursor_fields = ('publish_date',)
     search_form = forms.SearchPostForm
 
+    def get_validators(self):
+        """
+        Returns the latest dates and number of published posts.
+        """
+        return published_post_validators(models.Post.objects.all())
+
     def get_queryset(self):
         """
         Modifies queryset based on user input to form and returns.
@@ -141,12 +232,19 @@ class SearchView(generic.ListView):
             # Chain queryset dependent on user search form input.
             if tag_filter is not None:
                 queryset = queryset.filter(tags__name__iexact=str(tag_filter))
-            if post_filter is not None:
-                queryset = queryset.filter(title__icontains=post_filter)
+            if post_filter:
+                # Full-text search over title, subheading and body text.
+                queryset = search.search_posts(queryset, post_filter)
             if order_by == '0':
                 queryset = queryset.order_by('-publish_date')
             elif order_by == '1':
                 queryset = queryset.order_by('publish_date')
+            elif order_by == '2':
+                # Most relevant first, only meaningful if a search was made.
+                if post_filter:
+                    queryset = queryset.order_by('-rank', '-publish_date')
+                else:
+                    queryset = queryset.order_by('-publish_date')
 
             # Set search_form values so they are displayed on post-search render.
             self.search_form = form
@@ -162,7 +260,7 @@ class SearchView(generic.ListView):
                     tags__slug__iexact=self.kwargs['slug']).order_by('-publish_date')
 
                 self.search_form = self.search_form({
-                    'tag_input': models.Tag.objects.get(slug=self.kwargs['slug']),
+                    'tag_input': cache.get_tag(slug=self.kwargs['slug']),
                     'order_input': 0
                 })
 
@@ -173,7 +271,9 @@ class SearchView(generic.ListView):
                 queryset = models.Post.objects.filter(
                     publish_date__isnull=False).order_by('-publish_date')
 
-        return queryset
+        # Load authors and tags in bulk so each post card does not query for
+        # its tags.
+        return queryset.select_related('author').prefetch_related('tags')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -184,7 +284,8 @@ class SearchView(generic.ListView):
         return context
 
 
-class UserDraftListView(StaffRequiredMixin, generic.ListView):
+class UserDraftListView(StaffRequiredMixin, CursorPaginationMixin,
+                        generic.ListView):
     """
     List view of user's drafts with search, filter and sort functionality.
     """
@@ -192,6 +293,7 @@ class UserDraftListView(StaffRequiredMixin, generic.ListView):
     context_object_name = "posts"
     search_form = forms.SearchDraftForm
     paginate_by = 12
+    cursor_fields = ('created_date',)
 
     def get_queryset(self):
         """
@@ -236,7 +338,9 @@ class UserDraftListView(StaffRequiredMixin, generic.ListView):
                     queryset = models.Post.objects.filter(publish_date__isnull=True).filter(
                         author=self.request.user).order_by('-created_date')
 
-                return queryset
+                # Load authors and tags in bulk so each post card does not
+                # query for its tags.
+                return queryset.select_related('author').prefetch_related('tags')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -305,23 +409,36 @@ class TagCreateView(StaffRequiredMixin, SuccessMessageMixin,
     success_message = "%(name)s tag was created successfully"
 
 
-class TagOverviewView(generic.DetailView):
+class TagOverviewView(AnonymousPageCacheMixin, ConditionalGetMixin,
+                      generic.DetailView):
     """
     Displays tag detail and 4 most recent published posts under that topic.
     """
     model = models.Tag
 
+    def get_validators(self):
+        """
+        Returns the latest dates and number of published posts in the tag.
+        """
+        return published_post_validators(
+            models.Post.objects.filter(tags__slug=self.kwargs.get('slug')))
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
         # Adds post_list context with the 4 most recent posts under the topic.
-        context['post_list'] = self.object.posts.filter(
-            publish_date__isnull=False)[:4]
+        # Authors and tags are loaded in bulk for the post cards.
+        context['post_list'] = (self.object.posts
+                                .filter(publish_date__isnull=False)
+                                .select_related('author')
+                                .prefetch_related('tags')
+                                .order_by('-publish_date')[:4])
 
         return context
 
 
-class TagListView(generic.ListView):
+class TagListView(AnonymousPageCacheMixin, ConditionalGetMixin,
+                  generic.ListView):
     """
     List view of all tags with search and sort functionality.
     """
@@ -330,6 +447,13 @@ class TagListView(generic.ListView):
     paginate_by = 12
     search_form = forms.SearchTagForm
 
+    def get_validators(self):
+        """
+        Returns the latest dates and number of published posts. Tag edits
+        change the page cache version included in the ETag.
+        """
+        return published_post_validators(models.Post.objects.all())
+
     def get_queryset(self):
         """
         Modifies queryset based on user input to form and returns.
@@ -343,33 +467,29 @@ class TagListView(generic.ListView):
             name_filter = form.cleaned_data['name_input']
             order_by = form.cleaned_data['order_input']
 
-            # Base queryset, annotated with number of related posts.
-            queryset = models.Tag.objects.all().annotate(num_posts=Count('posts'))
+            # Base queryset. The number of published posts is stored on each
+            # tag (num_posts).
+            queryset = models.Tag.objects.all()
 
             # Chain queryset dependent on user search form input.
             if name_filter is not None:
                 queryset = queryset.filter(name__icontains=name_filter)
             if order_by == '0':
-                queryset = queryset.annotate(
-                    num_posts=Count('posts')).order_by('-num_posts')
+                queryset = queryset.order_by('-num_posts')
             if order_by == '1':
-                queryset = queryset.annotate(
-                    num_posts=Count('posts')).order_by('num_posts')
+                queryset = queryset.order_by('num_posts')
             if order_by == '2':
-                queryset = queryset.annotate(
-                    num_posts=Count('posts')).order_by(Lower('name'))
+                queryset = queryset.order_by(Lower('name'))
             if order_by == '3':
-                queryset = queryset.annotate(num_posts=Count(
-                    'posts')).order_by(Lower('name').desc())
+                queryset = queryset.order_by(Lower('name').desc())
 
             # Set search_form values so they are displayed on post-search render.
             self.search_form = form
 
-        # If data not submitted, set queryset to return all tags annoted with
-        # number of related posts and sorted by highest number of related posts.
+        # If data not submitted, set queryset to return all tags sorted by
+        # highest number of published posts.
         else:
-            queryset = models.Tag.objects.annotate(
-                num_posts=Count('posts')).order_by('-num_posts')
+            queryset = models.Tag.objects.order_by('-num_posts')
 
         return queryset
 
@@ -451,13 +571,14 @@ class Comment(LoginRequiredMixin, SingleObjectMixin, generic.FormView):
         return reverse('blog:post-detail', kwargs={'pk': self.object.pk})
 
 
-class CommentListView(generic.ListView):
+class CommentListView(CursorPaginationMixin, generic.ListView):
     """
     Additonal comment list view if >10 comments under post.
     """
     template_name = 'blog/comment_list.html'
     context_object_name = "comments"
     paginate_by = 10
+    cursor_fields = ('created_date',)
 
     def get_queryset(self):
         """
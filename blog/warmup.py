@@ -0,0 +1,156 @@
+# Cache warm-up after a deploy or worker restart.
+#
+# compile_templates() fills the worker's cached template loader (Django's
+# default loader when DEBUG is off), and warm_pages() renders the most
+# visited pages as an anonymous user, filling the shared page, comment and
+# query caches. Pages are rendered by calling their views directly rather
+# than through the middleware stack. Run by the warm_cache command after a
+# deploy and by each gunicorn worker on start (see gunicorn.conf.py), where
+# the warm-up is bounded by WARM_TIMEOUT as the worker is not yet serving.
+
+import asyncio
+import logging
+import os
+import time
+
+from asgiref.sync import async_to_sync
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.template import TemplateSyntaxError, engines
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from . import models
+
+logger = logging.getLogger(__name__)
+
+# Number of the most recent posts and the tags with most posts warmed.
+WARM_POSTS = 20
+WARM_TAGS = 10
+
+# Seconds spent rendering pages at most, well within the gunicorn worker
+# timeout (30 seconds by default).
+WARM_TIMEOUT = 10
+
+
+def template_names():
+    """
+    Yields the names of the project's templates, the blog's templates and
+    the crispy forms templates of CRISPY_TEMPLATE_PACK.
+    """
+    engine = engines['django'].engine
+    roots = [(str(directory), '') for directory in engine.dirs]
+    roots.append((os.path.join(apps.get_app_config('blog').path,
+                               'templates'), ''))
+    pack = getattr(settings, 'CRISPY_TEMPLATE_PACK', None)
+    if pack and apps.is_installed('crispy_forms'):
+        roots.append((os.path.join(apps.get_app_config('crispy_forms').path,
+                                   'templates', pack), pack))
+
+    for root, prefix in roots:
+        for directory, dirnames, filenames in os.walk(root):
+            for filename in filenames:
+                if filename.endswith(('.html', '.txt', '.xml')):
+                    path = os.path.relpath(
+                        os.path.join(directory, filename), root)
+                    yield os.path.join(prefix, path).replace(os.sep, '/')
+
+
+def compile_templates():
+    """
+    Loads every template, so the cached template loader keeps them
+    compiled. Returns the number of templates loaded.
+    """
+    engine = engines['django']
+    count = 0
+    for name in template_names():
+        try:
+            engine.get_template(name)
+        except TemplateSyntaxError:
+            # Templates of other packs or for optional apps.
+            logger.warning('Template %s could not be compiled', name)
+            continue
+        count += 1
+    return count
+
+
+def page_urls(num_posts=WARM_POSTS, num_tags=WARM_TAGS):
+    """
+    Returns the URLs of the landing page, the tag list, the tags with most
+    posts and the most recent posts.
+    """
+    urls = [reverse('blog:landing'), reverse('blog:tag-list'),
+            reverse('blog:post-search')]
+    tags = (models.Tag.objects
+            .order_by('-num_posts', 'name')
+            .values_list('slug', flat=True)[:num_tags])
+    urls += [reverse('blog:tag-overview', kwargs={'slug': slug})
+             for slug in tags]
+    posts = (models.Post.objects
+             .filter(publish_date__isnull=False)
+             .order_by('-publish_date', '-id')
+             .values_list('pk', flat=True)[:num_posts])
+    urls += [reverse('blog:post-detail', kwargs={'pk': pk}) for pk in posts]
+    return urls
+
+
+def get_host():
+    """
+    Returns the first host in ALLOWED_HOSTS, which pages are warmed for.
+    """
+    return next((host for host in settings.ALLOWED_HOSTS
+                 if host not in ('*', '') and not host.startswith('.')),
+                'localhost')
+
+
+def render_page(factory, url):
+    """
+    Renders the page at url as an anonymous HTTPS request by calling its
+    view, and returns the response.
+    """
+    request = factory.get(url, secure=True)
+    request.user = AnonymousUser()
+    match = resolve(url)
+    view = match.func
+    if asyncio.iscoroutinefunction(view):
+        view = async_to_sync(view)
+    response = view(request, *match.args, **match.kwargs)
+    if hasattr(response, 'render') and not response.is_rendered:
+        response.render()
+    return response
+
+
+def warm_pages(num_posts=WARM_POSTS, num_tags=WARM_TAGS,
+               timeout=WARM_TIMEOUT):
+    """
+    Renders each page of page_urls() as an anonymous user, stopping once
+    timeout seconds have passed (if given). Returns a list of (url, status
+    code, seconds taken) for the pages rendered.
+    """
+    factory = RequestFactory(HTTP_HOST=get_host())
+    deadline = time.monotonic() + timeout if timeout else None
+    results = []
+    for url in page_urls(num_posts, num_tags):
+        if deadline is not None and time.monotonic() >= deadline:
+            logger.warning('Cache warm-up stopped after %s seconds', timeout)
+            break
+        start = time.perf_counter()
+        response = render_page(factory, url)
+        results.append(
+            (url, response.status_code, time.perf_counter() - start))
+    return results
+
+
+def warm_worker():
+    """
+    Warms a newly started web worker. Errors are logged rather than raised,
+    so a failed warm-up never stops the worker from serving.
+    """
+    try:
+        count = compile_templates()
+        pages = warm_pages()
+    except Exception:
+        logger.exception('Cache warm-up failed')
+        return
+    logger.info('Warmed %d templates and %d pages', count, len(pages))
@@ -0,0 +1,12 @@
+# Gunicorn settings, read from the working directory on start.
+
+
+def post_worker_init(worker):
+    """
+    Compiles templates and warms the caches before the worker serves
+    requests, so the first requests after a deploy are not slowed down.
+    Pages are rendered for at most warmup.WARM_TIMEOUT seconds, within the
+    worker timeout.
+    """
+    from blog import warmup
+    warmup.warm_worker()